@@ -5,16 +5,87 @@ This layer enforces all symbology rules and invariants.
 The domain has no knowledge of HTTP or serialization concerns.
 """
 
+from collections.abc import Iterator
 from datetime import date
-from src.models import Mapping
+from itertools import pairwise
+from typing import Protocol
+from src.models import LoadStatus, Mapping, Operation, TerminateOperation
 from src.storage import MappingStorage
-from src.exceptions import ConflictError, NotFoundError
+from src.exceptions import (
+    ConflictError,
+    NotFoundError,
+    NotReadyError,
+    SymbologyError,
+)
+
+
+def check_disjoint(mappings: list[Mapping]) -> None:
+    """
+    Raise ConflictError if any two mappings share a symbol or an identifier
+    on overlapping dates, i.e. if they could not have been built through
+    add_mapping and terminate_mapping.
+    """
+    for field in ("symbol", "identifier"):
+        ordered = sorted(
+            mappings,
+            key=lambda m: (getattr(m, field), m.start_date, m.end_date or date.max),
+        )
+        for prev, cur in pairwise(ordered):
+            if getattr(prev, field) == getattr(cur, field) and (
+                prev.end_date is None or prev.end_date > cur.start_date
+            ):
+                raise ConflictError(
+                    f"Mappings for {field} '{getattr(cur, field)}' overlap "
+                    f"on {cur.start_date}."
+                )
+
+
+class SymbologyService(Protocol):
+    """
+    The domain API the HTTP layer is built on.
+
+    SymbologyServer implements it over one store; src.sharding provides a
+    symbol-sharded implementation across worker processes.
+    """
+
+    def load_status(self) -> LoadStatus: ...
+
+    def add_mapping(self, symbol: str, identifier: int, start_date: date) -> None: ...
+
+    def terminate_mapping(self, symbol: str, end_date: date) -> None: ...
+
+    def apply_transaction(self, operations: list[Operation]) -> None: ...
+
+    def get_identifier(self, symbol: str, query_date: date) -> int: ...
+
+    def get_symbol(self, identifier: int, query_date: date) -> str: ...
+
+    def get_mappings_between(self, begin: date, end: date) -> list[Mapping]: ...
+
+    def store_revision(self) -> str: ...
+
+    def export_rows(self) -> tuple[str, Iterator[Mapping]]: ...
+
+    def import_mappings(self, mappings: list[Mapping]) -> int: ...
 
 
 class SymbologyServer:
     def __init__(self, storage: MappingStorage):
         self.storage = storage
 
+    def load_status(self) -> LoadStatus:
+        """Return how far the underlying store has got with loading."""
+        return self.storage.load_status()
+
+    def _ensure_ready(self) -> None:
+        """Raise NotReadyError until the store has finished loading."""
+        if not self.storage.ready:
+            status = self.storage.load_status()
+            raise NotReadyError(
+                f"Store is not ready ({status.state}, "
+                f"{status.loaded} mappings loaded)."
+            )
+
     def add_mapping(self, symbol: str, identifier: int, start_date: date) -> None:
         """
         Create a new symbol↔identifier mapping starting on start_date.
@@ -22,19 +93,21 @@ class SymbologyServer:
         Raises ConflictError if the symbol or identifier already has an active
         mapping on start_date. The existing mapping must be terminated first.
         """
-        if self.storage.find_active_by_symbol(symbol, start_date):
-            raise ConflictError(
-                f"Symbol '{symbol}' already has an active mapping on {start_date}. "
-                "Terminate it before reassignment."
-            )
+        self._ensure_ready()
+        with self.storage.write_lock:
+            if self.storage.find_active_by_symbol(symbol, start_date):
+                raise ConflictError(
+                    f"Symbol '{symbol}' already has an active mapping on {start_date}. "
+                    "Terminate it before reassignment."
+                )
 
-        if self.storage.find_active_by_identifier(identifier, start_date):
-            raise ConflictError(
-                f"Identifier '{identifier}' is already assigned on {start_date}. "
-                "Terminate it before reassignment."
-            )
+            if self.storage.find_active_by_identifier(identifier, start_date):
+                raise ConflictError(
+                    f"Identifier '{identifier}' is already assigned on {start_date}. "
+                    "Terminate it before reassignment."
+                )
 
-        self.storage.insert(symbol, identifier, start_date)
+            self.storage.insert(symbol, identifier, start_date)
 
     def terminate_mapping(self, symbol: str, end_date: date) -> None:
         """
@@ -42,16 +115,41 @@ class SymbologyServer:
 
         Raises NotFoundError if no active mapping exists for symbol on end_date.
         """
-        mapping = self.storage.find_active_by_symbol(symbol, end_date)
-        if not mapping:
-            raise NotFoundError(
-                f"No active mapping found for symbol '{symbol}' on {end_date}."
-            )
-        mapping.end_date = end_date
-        self.storage.save()
+        self._ensure_ready()
+        with self.storage.write_lock:
+            mapping = self.storage.find_active_by_symbol(symbol, end_date)
+            if not mapping:
+                raise NotFoundError(
+                    f"No active mapping found for symbol '{symbol}' on {end_date}."
+                )
+            self.storage.terminate(mapping, end_date)
+
+    def apply_transaction(self, operations: list[Operation]) -> None:
+        """
+        Apply a batch of add/terminate operations all-or-nothing.
+
+        Each operation is validated against the store as modified by the
+        operations before it, so a rename can terminate a symbol and hand its
+        identifier to a new one in the same batch. If any operation fails, none
+        are applied and the error is re-raised prefixed with the operation's
+        position. On success the batch is persisted once and becomes visible
+        to readers atomically.
+        """
+        self._ensure_ready()
+        with self.storage.transaction() as staged:
+            batch = SymbologyServer(staged)
+            for position, op in enumerate(operations):
+                try:
+                    if isinstance(op, TerminateOperation):
+                        batch.terminate_mapping(op.symbol, op.end_date)
+                    else:
+                        batch.add_mapping(op.symbol, op.identifier, op.start_date)
+                except SymbologyError as exc:
+                    raise type(exc)(f"Operation {position}: {exc}") from exc
 
     def lookup(self, symbol: str, query_date: date) -> Mapping:
         """Return the active Mapping for symbol on query_date, or raise NotFoundError."""
+        self._ensure_ready()
         mapping = self.storage.find_active_by_symbol(symbol, query_date)
         if not mapping:
             raise NotFoundError(f"No mapping found for '{symbol}' on {query_date}.")
@@ -68,6 +166,7 @@ class SymbologyServer:
         Uses the same half-open interval semantics [start_date, end_date)
         as the rest of the domain.
         """
+        self._ensure_ready()
         mapping = self.storage.find_active_by_identifier(identifier, query_date)
         if not mapping:
             raise NotFoundError(
@@ -77,4 +176,33 @@ class SymbologyServer:
 
     def get_mappings_between(self, begin: date, end: date) -> list[Mapping]:
         """Return all mappings that overlap the half-open date range [begin, end)."""
+        self._ensure_ready()
         return self.storage.get_mappings_between(begin, end)
+
+    def store_revision(self) -> str:
+        """Return a token that changes whenever the store is written."""
+        return f"{self.storage.instance_id}-{self.storage.revision}"
+
+    def export_rows(self) -> tuple[str, Iterator[Mapping]]:
+        """Return the store revision and every mapping as of that revision."""
+        self._ensure_ready()
+        revision, rows = self.storage.export_rows()
+        return f"{self.storage.instance_id}-{revision}", rows
+
+    def import_mappings(self, mappings: list[Mapping]) -> int:
+        """
+        Load a full export into an empty store in one step.
+
+        The mappings are checked as a whole for overlapping symbols or
+        identifiers rather than replayed one by one, then inserted and saved
+        once. Raises ConflictError if the store already holds mappings.
+        """
+        self._ensure_ready()
+        check_disjoint(mappings)
+        with self.storage.write_lock:
+            if not self.storage.is_empty():
+                raise ConflictError(
+                    "Import requires an empty store; it already holds mappings."
+                )
+            self.storage.bulk_insert(mappings)
+        return len(mappings)
@@ -28,3 +28,15 @@ class ConflictError(SymbologyError):
     """
 
     pass
+
+
+class NotReadyError(SymbologyError):
+    """Raised when the store is still loading and cannot serve requests yet."""
+
+    pass
+
+
+class SnapshotExpiredError(SymbologyError):
+    """Raised when an export is requested for a store revision that has moved on."""
+
+    pass
@@ -0,0 +1,355 @@
+"""
+Load-testing harness for the symbology server.
+
+Seeds a synthetic mapping history, then drives a configurable mix of
+lookups, range queries and writes with Zipf-skewed keys, and reports
+throughput plus p50/p95/p99/max latency per route as JSON. By default the
+app runs in-process over an ASGI transport; pass --url to target a server
+started separately (e.g. with uvicorn).
+
+    python -m src.loadtest --requests 20000 --concurrency 32
+    python -m src.loadtest --url http://localhost:8000 --mix symbol=70,write=5
+
+Requires httpx (a dev dependency).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+import httpx
+from src.main import create_app
+from src.storage import MappingStorage
+
+ROUTES = {
+    "symbol": "GET /symbol/{symbol}",
+    "identifier": "GET /identifier/{identifier}",
+    "mappings": "GET /mappings",
+    "write": "POST /transactions",
+}
+
+HISTORY_START = date(2000, 1, 1)
+
+# Operations per POST /transactions call while seeding.
+SEED_BATCH_SIZE = 500
+
+
+@dataclass
+class LoadTestConfig:
+    symbols: int = 1000
+    segments_per_symbol: int = 4
+    segment_days: int = 365 * 3
+    requests: int = 10000
+    concurrency: int = 16
+    zipf_s: float = 1.1
+    range_days: int = 30
+    mix: dict[str, int] = field(
+        default_factory=lambda: {
+            "symbol": 60,
+            "identifier": 20,
+            "mappings": 10,
+            "write": 10,
+        }
+    )
+    seed: int = 0
+    url: str | None = None
+
+
+@dataclass
+class SymbolHistory:
+    """Client-side view of one symbol's intervals, used to pick query targets."""
+
+    symbol: str
+    intervals: list[tuple[int, date, date | None]]
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+def zipf_cum_weights(n: int, s: float) -> list[float]:
+    """Cumulative weights for ranks 1..n with P(rank k) proportional to 1/k**s."""
+    total = 0.0
+    cum = []
+    for k in range(1, n + 1):
+        total += 1.0 / k**s
+        cum.append(total)
+    return cum
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_history(config: LoadTestConfig, rng: random.Random) -> list[SymbolHistory]:
+    """
+    Generate back-to-back intervals per symbol, each with a fresh identifier.
+
+    Every symbol's last interval is open-ended, so lookups at recent dates hit
+    active mappings and older dates hit terminated history.
+    """
+    histories = []
+    next_identifier = 1
+    for k in range(config.symbols):
+        start = HISTORY_START + timedelta(days=rng.randrange(config.segment_days))
+        intervals = []
+        for j in range(config.segments_per_symbol):
+            end = (
+                start + timedelta(days=config.segment_days)
+                if j < config.segments_per_symbol - 1
+                else None
+            )
+            intervals.append((next_identifier, start, end))
+            next_identifier += 1
+            start = end
+        histories.append(SymbolHistory(f"S{k:06d}", intervals))
+    return histories
+
+
+def seed_operations(histories: list[SymbolHistory]) -> list[dict]:
+    """Transaction operations that recreate the synthetic history."""
+    operations = []
+    for history in histories:
+        for identifier, start, end in history.intervals:
+            operations.append(
+                {
+                    "op": "add",
+                    "symbol": history.symbol,
+                    "identifier": identifier,
+                    "start_date": start.isoformat(),
+                }
+            )
+            if end is not None:
+                operations.append(
+                    {
+                        "op": "terminate",
+                        "symbol": history.symbol,
+                        "end_date": end.isoformat(),
+                    }
+                )
+    return operations
+
+
+async def seed(client: httpx.AsyncClient, histories: list[SymbolHistory]) -> None:
+    operations = seed_operations(histories)
+    for i in range(0, len(operations), SEED_BATCH_SIZE):
+        response = await client.post(
+            "/transactions", json={"operations": operations[i : i + SEED_BATCH_SIZE]}
+        )
+        response.raise_for_status()
+
+
+class LoadGenerator:
+    def __init__(self, config: LoadTestConfig, histories: list[SymbolHistory]):
+        self.config = config
+        self.histories = histories
+        self.rng = random.Random(config.seed)
+        self.cum_weights = zipf_cum_weights(len(histories), config.zipf_s)
+        self.kinds = list(config.mix)
+        self.kind_weights = [config.mix[kind] for kind in self.kinds]
+        self.history_end = max(
+            start for h in histories for _, start, _ in h.intervals
+        ) + timedelta(days=config.segment_days)
+        self.next_identifier = 1 + sum(len(h.intervals) for h in histories)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def pick_history(self) -> SymbolHistory:
+        return self.rng.choices(self.histories, cum_weights=self.cum_weights)[0]
+
+    def random_date(self, begin: date, end: date) -> date:
+        return begin + timedelta(days=self.rng.randrange(max(1, (end - begin).days)))
+
+    async def timed(
+        self, client: httpx.AsyncClient, kind: str, method: str, url: str, **kwargs
+    ) -> int:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        self.latencies[ROUTES[kind]].append(elapsed)
+        self.statuses[ROUTES[kind]][response.status_code] += 1
+        return response.status_code
+
+    async def one_request(self, client: httpx.AsyncClient) -> None:
+        kind = self.rng.choices(self.kinds, weights=self.kind_weights)[0]
+        history = self.pick_history()
+
+        if kind == "symbol":
+            query_date = self.random_date(HISTORY_START, self.history_end)
+            await self.timed(
+                client,
+                kind,
+                "GET",
+                f"/symbol/{history.symbol}",
+                params={"date": query_date.isoformat()},
+            )
+        elif kind == "identifier":
+            identifier, start, end = self.rng.choice(history.intervals)
+            query_date = self.random_date(start, end or self.history_end)
+            await self.timed(
+                client,
+                kind,
+                "GET",
+                f"/identifier/{identifier}",
+                params={"date": query_date.isoformat()},
+            )
+        elif kind == "mappings":
+            begin = self.random_date(HISTORY_START, self.history_end)
+            end = begin + timedelta(days=self.config.range_days)
+            await self.timed(
+                client,
+                kind,
+                "GET",
+                "/mappings",
+                params={"begin": begin.isoformat(), "end": end.isoformat()},
+            )
+        else:
+            await self.write(client, history)
+
+    async def write(self, client: httpx.AsyncClient, history: SymbolHistory) -> None:
+        """Reassign the symbol to a fresh identifier, as a rename would."""
+        async with history.lock:
+            _, start, _ = history.intervals[-1]
+            boundary = start + timedelta(days=1)
+            identifier = self.next_identifier
+            self.next_identifier += 1
+            operations = [
+                {
+                    "op": "terminate",
+                    "symbol": history.symbol,
+                    "end_date": boundary.isoformat(),
+                },
+                {
+                    "op": "add",
+                    "symbol": history.symbol,
+                    "identifier": identifier,
+                    "start_date": boundary.isoformat(),
+                },
+            ]
+            status = await self.timed(
+                client,
+                "write",
+                "POST",
+                "/transactions",
+                json={"operations": operations},
+            )
+            if status != 200:
+                return
+            last_identifier, last_start, _ = history.intervals[-1]
+            history.intervals[-1] = (last_identifier, last_start, boundary)
+            history.intervals.append((identifier, boundary, None))
+
+    async def drive(self, client: httpx.AsyncClient) -> float:
+        """Issue config.requests requests from concurrent workers; return wall time."""
+        remaining = self.config.requests
+
+        async def worker() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await self.one_request(client)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.config.concurrency)))
+        return time.perf_counter() - started
+
+    def report(self, duration: float) -> dict:
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values.sort()
+            routes[route] = {
+                "count": len(values),
+                "throughput_rps": round(len(values) / duration, 1),
+                "status": {
+                    str(code): n for code, n in sorted(self.statuses[route].items())
+                },
+                "latency_ms": {
+                    "p50": round(percentile(values, 50) * 1000, 3),
+                    "p95": round(percentile(values, 95) * 1000, 3),
+                    "p99": round(percentile(values, 99) * 1000, 3),
+                    "max": round(values[-1] * 1000, 3),
+                },
+            }
+        total = sum(route["count"] for route in routes.values())
+        return {
+            "config": asdict(self.config),
+            "duration_s": round(duration, 3),
+            "requests": total,
+            "throughput_rps": round(total / duration, 1),
+            "routes": routes,
+        }
+
+
+def make_client(config: LoadTestConfig) -> httpx.AsyncClient:
+    if config.url:
+        return httpx.AsyncClient(base_url=config.url)
+    app = create_app(MappingStorage())
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://loadtest"
+    )
+
+
+async def run(config: LoadTestConfig) -> dict:
+    """Seed the target, run the load and return the JSON-serializable report."""
+    histories = build_history(config, random.Random(config.seed))
+    async with make_client(config) as client:
+        await seed(client, histories)
+        generator = LoadGenerator(config, histories)
+        duration = await generator.drive(client)
+    return generator.report(duration)
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ROUTES or not weight.isdigit():
+            raise argparse.ArgumentTypeError(
+                f"Bad mix entry '{part}'; expected one of "
+                f"{', '.join(ROUTES)} as name=weight."
+            )
+        mix[kind] = int(weight)
+    return mix
+
+
+def main(argv: list[str] | None = None) -> None:
+    defaults = LoadTestConfig()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--url", help="Target a running server instead of in-process")
+    parser.add_argument("--symbols", type=int, default=defaults.symbols)
+    parser.add_argument(
+        "--segments-per-symbol", type=int, default=defaults.segments_per_symbol
+    )
+    parser.add_argument("--segment-days", type=int, default=defaults.segment_days)
+    parser.add_argument("--requests", type=int, default=defaults.requests)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--zipf-s", type=float, default=defaults.zipf_s)
+    parser.add_argument("--range-days", type=int, default=defaults.range_days)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=defaults.mix,
+        help="Comma-separated route weights, e.g. symbol=60,identifier=20,"
+        "mappings=10,write=10; omitted routes are not exercised",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", help="Write the JSON report here, not stdout")
+    args = parser.parse_args(argv)
+
+    options = vars(args)
+    output = options.pop("output")
+    config = LoadTestConfig(**options)
+    report = json.dumps(asyncio.run(run(config)), indent=2, default=str)
+    if output:
+        with open(output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
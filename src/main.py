@@ -1,23 +1,95 @@
 """
 Application entry point for the Symbology Server.
+
+Building the app is cheap: the persisted store is read on a background thread
+once the server has started, so the process is listening (and /health answers)
+while a large file is still loading. /ready reports progress and data routes
+return 503 until loading completes.
 """
 
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from src.domain import SymbologyServer
 from src.storage import MappingStorage
 from src.routes import create_router
+from src.sharding import ShardedSymbologyServer
+from src.snapshots import SnapshotExporter
+
+# Path of the JSON persist file for the default app; unset means in-memory only.
+PERSIST_FILE_ENV = "SYMBOLOGY_PERSIST_FILE"
+
+# Path of the cold history segment; setting it enables tiered storage.
+COLD_FILE_ENV = "SYMBOLOGY_COLD_FILE"
+
+# Number of symbol-hash shard processes for the default app; 1 means unsharded.
+SHARDS_ENV = "SYMBOLOGY_SHARDS"
 
 
 def create_app(storage: MappingStorage | None = None) -> FastAPI:
     """
     Create FastAPI app with optional storage injection.
-    If no storage is provided, use default in-memory storage.
+    If no storage is provided, use default in-memory storage, persisted to
+    $SYMBOLOGY_PERSIST_FILE when that is set and tiered with old history in
+    $SYMBOLOGY_COLD_FILE when that is set. With $SYMBOLOGY_SHARDS above 1,
+    the default store is split across that many worker processes instead.
+
+    A storage that has not been loaded yet is loaded in the background on
+    application startup.
     """
+    shards = int(os.environ.get(SHARDS_ENV, "1"))
+    if storage is None and shards > 1:
+        return create_sharded_app(
+            ShardedSymbologyServer(
+                shards,
+                persist_file=os.environ.get(PERSIST_FILE_ENV),
+                cold_file=os.environ.get(COLD_FILE_ENV),
+            )
+        )
+
     if storage is None:
-        storage = MappingStorage()
-    app = FastAPI()
+        storage = MappingStorage(
+            persist_file=os.environ.get(PERSIST_FILE_ENV),
+            autoload=False,
+            cold_file=os.environ.get(COLD_FILE_ENV),
+        )
+
     domain = SymbologyServer(storage)
-    router = create_router(domain)
+    exporter = SnapshotExporter(domain.store_revision, domain.export_rows)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        if storage.load_status().state == "pending":
+            storage.start_background_load()
+        yield
+        exporter.close()
+        storage.close()
+
+    app = FastAPI(lifespan=lifespan)
+    router = create_router(domain, exporter)
+    app.include_router(router)
+
+    return app
+
+
+def create_sharded_app(domain: ShardedSymbologyServer) -> FastAPI:
+    """
+    Create FastAPI app backed by shard worker processes.
+    Workers are launched on application startup and stopped on shutdown.
+    """
+
+    exporter = SnapshotExporter(domain.store_revision, domain.export_rows)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        domain.start()
+        yield
+        exporter.close()
+        domain.close()
+
+    app = FastAPI(lifespan=lifespan)
+    router = create_router(domain, exporter)
     app.include_router(router)
 
     return app
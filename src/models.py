@@ -23,3 +23,37 @@ class Mapping:
     identifier: int
     start_date: date
     end_date: Optional[date] = None
+
+
+@dataclass
+class AddOperation:
+    """A pending add_mapping call within a transaction."""
+
+    symbol: str
+    identifier: int
+    start_date: date
+
+
+@dataclass
+class TerminateOperation:
+    """A pending terminate_mapping call within a transaction."""
+
+    symbol: str
+    end_date: date
+
+
+Operation = AddOperation | TerminateOperation
+
+
+@dataclass
+class LoadStatus:
+    """
+    Progress of loading the persisted store into memory.
+
+    state is one of "pending", "loading", "ready" or "failed". total is None
+    until the persist file has been parsed and the record count is known.
+    """
+
+    state: str
+    loaded: int = 0
+    total: Optional[int] = None
@@ -5,21 +5,123 @@ This module handles request/response translation only.
 All business logic lives in the domain layer.
 """
 
+import os
+import shutil
+import tempfile
+from collections.abc import Iterator
 from datetime import date as DateType
-from fastapi import APIRouter, HTTPException, Query
-from src.domain import SymbologyServer
-from src.exceptions import ConflictError, NotFoundError
+from typing import BinaryIO, Literal
+import anyio
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from src.domain import SymbologyService
+from src.exceptions import (
+    ConflictError,
+    NotFoundError,
+    NotReadyError,
+    SnapshotExpiredError,
+)
+from src.models import AddOperation, TerminateOperation
+from src.snapshots import MEDIA_TYPES, SnapshotExporter, read_rows
 from src.schemas import (
     MappingCreate,
     MappingTerminate,
     MappingResponse,
     MappingCreated,
     MappingTerminated,
+    HealthResponse,
+    ImportCompleted,
+    ReadinessResponse,
+    TransactionAdd,
+    TransactionCreate,
+    TransactionCommitted,
 )
 
+# Hint to clients and load balancers while the store is still loading.
+RETRY_AFTER_SECONDS = "1"
+
+
+def not_ready(exc: NotReadyError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(exc),
+        headers={"Retry-After": RETRY_AFTER_SECONDS},
+    )
+
+
+# Bytes read per chunk when streaming an export.
+EXPORT_CHUNK_SIZE = 1 << 16
+
+SnapshotFormat = Literal["ndjson", "segment"]
+
+
+def parse_byte_range(header: str, size: int) -> tuple[int, int]:
+    """
+    Parse a single "bytes=start-end" Range header into inclusive offsets.
+    Suffix ranges ("bytes=-n") and open ends ("bytes=n-") are supported.
+    """
+    unit, _, spec = header.partition("=")
+    first, sep, last = spec.strip().partition("-")
+    try:
+        if unit.strip() != "bytes" or not sep or "," in spec:
+            raise ValueError
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        raise HTTPException(status_code=416, detail=f"Unsupported Range '{header}'.")
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail=f"Range '{header}' is outside the {size}-byte export.",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
 
-def create_router(domain: SymbologyServer) -> APIRouter:
+
+def read_file_range(f: BinaryIO, start: int, end: int) -> Iterator[bytes]:
+    with f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(EXPORT_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def create_router(
+    domain: SymbologyService, exporter: SnapshotExporter | None = None
+) -> APIRouter:
+    """
+    Build the API routes over domain. Exports are cached by exporter; pass
+    one in to be able to close() it on shutdown.
+    """
     router = APIRouter()
+    if exporter is None:
+        exporter = SnapshotExporter(domain.store_revision, domain.export_rows)
+
+    @router.get("/health", response_model=HealthResponse)
+    def health() -> HealthResponse:
+        """Liveness probe: the process is up and serving HTTP."""
+        return HealthResponse()
+
+    @router.get("/ready", response_model=ReadinessResponse)
+    def ready(response: Response) -> ReadinessResponse:
+        """Readiness probe: 200 once the store has loaded, 503 until then."""
+        status = domain.load_status()
+        is_ready = status.state == "ready"
+        if not is_ready:
+            response.status_code = 503
+        return ReadinessResponse(
+            ready=is_ready,
+            state=status.state,
+            loaded=status.loaded,
+            total=status.total,
+        )
 
     @router.post("/mapping", response_model=MappingCreated, status_code=201)
     def add_mapping(request: MappingCreate) -> MappingCreated:
@@ -27,6 +129,8 @@ def create_router(domain: SymbologyServer) -> APIRouter:
             domain.add_mapping(request.symbol, request.identifier, request.start_date)
         except ConflictError as exc:
             raise HTTPException(status_code=409, detail=str(exc))
+        except NotReadyError as exc:
+            raise not_ready(exc)
         return MappingCreated(
             symbol=request.symbol,
             identifier=request.identifier,
@@ -39,8 +143,30 @@ def create_router(domain: SymbologyServer) -> APIRouter:
             domain.terminate_mapping(request.symbol, request.end_date)
         except NotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc))
+        except NotReadyError as exc:
+            raise not_ready(exc)
         return MappingTerminated(symbol=request.symbol, end_date=request.end_date)
 
+    @router.post("/transactions", response_model=TransactionCommitted)
+    def apply_transaction(request: TransactionCreate) -> TransactionCommitted:
+        operations = [
+            (
+                AddOperation(op.symbol, op.identifier, op.start_date)
+                if isinstance(op, TransactionAdd)
+                else TerminateOperation(op.symbol, op.end_date)
+            )
+            for op in request.operations
+        ]
+        try:
+            domain.apply_transaction(operations)
+        except ConflictError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+        except NotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc))
+        except NotReadyError as exc:
+            raise not_ready(exc)
+        return TransactionCommitted(applied=len(operations))
+
     @router.get("/symbol/{symbol}", response_model=int)
     def get_identifier(
         symbol: str,
@@ -50,6 +176,8 @@ def create_router(domain: SymbologyServer) -> APIRouter:
             return domain.get_identifier(symbol, date)
         except NotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc))
+        except NotReadyError as exc:
+            raise not_ready(exc)
 
     @router.get("/identifier/{identifier}", response_model=str)
     def get_symbol(
@@ -60,12 +188,97 @@ def create_router(domain: SymbologyServer) -> APIRouter:
             return domain.get_symbol(identifier, date)
         except NotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc))
+        except NotReadyError as exc:
+            raise not_ready(exc)
 
     @router.get("/mappings", response_model=list[MappingResponse])
     def get_mappings(
         begin: DateType = Query(..., description="Range start (inclusive)"),
         end: DateType = Query(..., description="Range end (exclusive)"),
     ) -> list[MappingResponse]:
-        return domain.get_mappings_between(begin, end)
+        try:
+            return domain.get_mappings_between(begin, end)
+        except NotReadyError as exc:
+            raise not_ready(exc)
+
+    @router.get("/export")
+    def export_store(
+        request: Request,
+        format: SnapshotFormat = Query("ndjson"),
+        revision: str | None = Query(
+            None, description="Revision from an earlier export, to resume it"
+        ),
+        offset: int = Query(0, ge=0, description="Byte offset to resume from"),
+    ) -> StreamingResponse:
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if (range_header or offset) and revision is None and if_range is None:
+            raise HTTPException(
+                status_code=428,
+                detail="Resuming an export requires the revision parameter or "
+                "an If-Range header with the export's ETag.",
+            )
+        try:
+            snapshot, f = exporter.open(format, revision)
+        except NotReadyError as exc:
+            raise not_ready(exc)
+        except SnapshotExpiredError as exc:
+            raise HTTPException(status_code=412, detail=str(exc))
+
+        etag = f'"{snapshot.revision}"'
+        if if_range is not None and if_range.strip() != etag:
+            # The client holds part of another revision: send this one whole.
+            range_header, offset = None, 0
+        try:
+            if range_header:
+                start, end = parse_byte_range(range_header, snapshot.size)
+            else:
+                start, end = parse_byte_range(f"bytes={offset}-", snapshot.size)
+        except HTTPException:
+            f.close()
+            raise
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(end - start + 1),
+            "ETag": etag,
+            "X-Store-Revision": snapshot.revision,
+        }
+        partial = (start, end) != (0, snapshot.size - 1)
+        if partial:
+            headers["Content-Range"] = f"bytes {start}-{end}/{snapshot.size}"
+        return StreamingResponse(
+            read_file_range(f, start, end),
+            status_code=206 if partial else 200,
+            media_type=MEDIA_TYPES[format],
+            headers=headers,
+        )
+
+    @router.post("/import", response_model=ImportCompleted)
+    async def import_store(
+        request: Request, format: SnapshotFormat = Query("ndjson")
+    ) -> ImportCompleted:
+        # File I/O runs off the event loop so a large upload does not stall
+        # other requests.
+        directory = await run_in_threadpool(
+            tempfile.mkdtemp, prefix="symbology-import-"
+        )
+        try:
+            path = os.path.join(directory, "import")
+            async with await anyio.open_file(path, "wb") as f:
+                async for chunk in request.stream():
+                    await f.write(chunk)
+            try:
+                mappings = await run_in_threadpool(read_rows, path, format)
+            except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc))
+        finally:
+            await run_in_threadpool(shutil.rmtree, directory, ignore_errors=True)
+        try:
+            count = await run_in_threadpool(domain.import_mappings, mappings)
+        except ConflictError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+        except NotReadyError as exc:
+            raise not_ready(exc)
+        return ImportCompleted(count=count, revision=domain.store_revision())
 
     return router
@@ -5,15 +5,18 @@ These are API boundary types only — separate from the domain model.
 """
 
 from datetime import date
-from typing import Optional
-from pydantic import BaseModel
+from typing import Annotated, Literal, Optional
+from pydantic import BaseModel, Field
+
+# Identifiers are stored as signed 64-bit integers in cold segments.
+Identifier = Annotated[int, Field(ge=-(2**63), le=2**63 - 1)]
 
 # ── Request schemas ───────────────────────────────────────────────────────────
 
 
 class MappingCreate(BaseModel):
     symbol: str
-    identifier: int
+    identifier: Identifier
     start_date: date
 
 
@@ -22,6 +25,20 @@ class MappingTerminate(BaseModel):
     end_date: date
 
 
+class TransactionAdd(MappingCreate):
+    op: Literal["add"]
+
+
+class TransactionTerminate(MappingTerminate):
+    op: Literal["terminate"]
+
+
+class TransactionCreate(BaseModel):
+    operations: list[
+        Annotated[TransactionAdd | TransactionTerminate, Field(discriminator="op")]
+    ] = Field(min_length=1)
+
+
 # ── Response schemas ──────────────────────────────────────────────────────────
 
 
@@ -38,9 +55,31 @@ class MappingTerminated(BaseModel):
     end_date: date
 
 
+class TransactionCommitted(BaseModel):
+    status: str = "committed"
+    applied: int
+
+
+class ImportCompleted(BaseModel):
+    status: str = "imported"
+    count: int
+    revision: str
+
+
+class HealthResponse(BaseModel):
+    status: str = "ok"
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    state: str
+    loaded: int
+    total: Optional[int] = None
+
+
 class MappingResponse(BaseModel):
     symbol: str
-    identifier: int
+    identifier: Identifier
     start_date: date
     end_date: Optional[date] = None
 
@@ -0,0 +1,308 @@
+"""
+On-disk, memory-mapped mapping segments.
+
+A segment is an immutable, sorted file of mappings that is searched in place
+through mmap rather than loaded into Python objects, so its size does not
+count against resident memory. Tiered storage keeps old terminated history
+in one; lookups decode only the records they touch.
+
+Layout (little-endian):
+
+    header      magic, record count, horizon ordinal, identifier index
+                offset, start index offset, string table offset, longest
+                record span in days
+    records     identifier, start ordinal, end ordinal (0 = open-ended),
+                symbol offset, symbol length — sorted by (symbol, start)
+    index       record positions sorted by (identifier, start)
+    index       record positions sorted by start
+    strings     UTF-8 symbols, each distinct symbol stored once
+"""
+
+import heapq
+import io
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Collection, Iterable, Iterator
+from datetime import date
+from src.models import Mapping
+
+MAGIC = b"SYMSEG02"
+HEADER = struct.Struct("<8sQqQQQq")
+RECORD = struct.Struct("<qiiII")
+POSITION = struct.Struct("<I")
+
+# End ordinal stored for open-ended mappings; real ordinals start at 1.
+OPEN_END = 0
+
+MappingKey = tuple[str, int, date, date | None]
+
+
+def mapping_key(mapping: Mapping) -> MappingKey:
+    """
+    Identify a record by its full contents.
+
+    end_date is part of the key: a mapping terminated on its start date can
+    share symbol, identifier and start_date with a later one.
+    """
+    return (mapping.symbol, mapping.identifier, mapping.start_date, mapping.end_date)
+
+
+def record_order(mapping: Mapping) -> tuple[bytes, int, int, int]:
+    """Sort key for the order records are stored in: (symbol, start, end, id)."""
+    return (
+        mapping.symbol.encode(),
+        mapping.start_date.toordinal(),
+        mapping.end_date.toordinal() if mapping.end_date else OPEN_END,
+        mapping.identifier,
+    )
+
+
+class ColdSegment:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            count,
+            horizon,
+            index_offset,
+            start_index_offset,
+            strings_offset,
+            max_span,
+        ) = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a mapping segment.")
+        self.path = path
+        self.horizon = date.fromordinal(horizon)
+        self._count = count
+        self._index_offset = index_offset
+        self._start_index_offset = start_index_offset
+        self._strings_offset = strings_offset
+        self._max_span = max_span
+        self._check_layout()
+
+    def _check_layout(self) -> None:
+        """Raise ValueError unless the regions fill the file exactly."""
+        index_size = self._count * POSITION.size
+        if (
+            self._index_offset != HEADER.size + self._count * RECORD.size
+            or self._start_index_offset != self._index_offset + index_size
+            or self._strings_offset != self._start_index_offset + index_size
+            or self._strings_offset > len(self._buf)
+        ):
+            raise ValueError(f"{self.path} is truncated or corrupt.")
+        strings_end = self._strings_offset
+        if self._count:
+            # Symbols are stored in record order, so the last record's symbol
+            # ends the string table.
+            _, _, _, offset, length = self._row(self._count - 1)
+            strings_end += offset + length
+        if strings_end != len(self._buf):
+            raise ValueError(
+                f"{self.path} is truncated or corrupt: expected "
+                f"{strings_end} bytes, found {len(self._buf)}."
+            )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Mapping]:
+        for pos in range(self._count):
+            yield self._mapping(pos)
+
+    def _row(self, pos: int) -> tuple[int, int, int, int, int]:
+        return RECORD.unpack_from(self._buf, HEADER.size + pos * RECORD.size)
+
+    def _symbol(self, offset: int, length: int) -> bytes:
+        start = self._strings_offset + offset
+        return self._buf[start : start + length]
+
+    def _symbol_at(self, pos: int) -> bytes:
+        _, _, _, offset, length = self._row(pos)
+        return self._symbol(offset, length)
+
+    def _position(self, rank: int, index_offset: int | None = None) -> int:
+        """Record position at rank in the identifier index (or index_offset's)."""
+        if index_offset is None:
+            index_offset = self._index_offset
+        return POSITION.unpack_from(self._buf, index_offset + rank * POSITION.size)[0]
+
+    def _mapping(self, pos: int) -> Mapping:
+        identifier, start, end, offset, length = self._row(pos)
+        return Mapping(
+            symbol=self._symbol(offset, length).decode(),
+            identifier=identifier,
+            start_date=date.fromordinal(start),
+            end_date=None if end == OPEN_END else date.fromordinal(end),
+        )
+
+    def by_symbol(self, symbol: str) -> Iterator[Mapping]:
+        """Yield every mapping for symbol, in start_date order."""
+        key = symbol.encode()
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._symbol_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._count and self._symbol_at(lo) == key:
+            yield self._mapping(lo)
+            lo += 1
+
+    def by_identifier(self, identifier: int) -> Iterator[Mapping]:
+        """Yield every mapping for identifier, in start_date order."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._row(self._position(mid))[0] < identifier:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._count:
+            pos = self._position(lo)
+            if self._row(pos)[0] != identifier:
+                break
+            yield self._mapping(pos)
+            lo += 1
+
+    def overlapping(self, begin: date, end: date) -> Iterator[Mapping]:
+        """Yield every mapping overlapping [begin, end), in start_date order."""
+        # No record lasts longer than max_span days, so records starting
+        # before this have all ended by begin.
+        first = begin.toordinal() - self._max_span
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._row(self._position(mid, self._start_index_offset))[1] < first:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._count:
+            pos = self._position(lo, self._start_index_offset)
+            _, start, stop, _, _ = self._row(pos)
+            if start >= end.toordinal():
+                break
+            if stop == OPEN_END or stop > begin.toordinal():
+                yield self._mapping(pos)
+            lo += 1
+
+    def contains(self, key: MappingKey) -> bool:
+        return any(mapping_key(m) == key for m in self.by_symbol(key[0]))
+
+    def _excluded(self, pos: int, exclude: Collection[MappingKey]) -> bool:
+        if not exclude:
+            return False
+        return mapping_key(self._mapping(pos)) in exclude
+
+    def _rows(
+        self, exclude: Collection[MappingKey]
+    ) -> Iterator[tuple[bytes, int, int, int, int, int]]:
+        """Merge rows in record order: (symbol, start, end, identifier, 0, pos)."""
+        for pos in range(self._count):
+            if self._excluded(pos, exclude):
+                continue
+            identifier, start, end, offset, length = self._row(pos)
+            yield self._symbol(offset, length), start, end, identifier, 0, pos
+
+    def _identifier_order(
+        self, exclude: Collection[MappingKey]
+    ) -> Iterator[tuple[int, int, int, int]]:
+        """Merge rows in identifier index order: (identifier, start, 0, pos)."""
+        for rank in range(self._count):
+            pos = self._position(rank)
+            if not self._excluded(pos, exclude):
+                identifier, start, _, _, _ = self._row(pos)
+                yield identifier, start, 0, pos
+
+    def _start_order(
+        self, exclude: Collection[MappingKey]
+    ) -> Iterator[tuple[int, int, int]]:
+        """Merge rows in start index order: (start, 0, pos)."""
+        for rank in range(self._count):
+            pos = self._position(rank, self._start_index_offset)
+            if not self._excluded(pos, exclude):
+                yield self._row(pos)[1], 0, pos
+
+
+def write_segment(
+    path: str,
+    horizon: date,
+    additions: Iterable[Mapping],
+    base: ColdSegment | None = None,
+    exclude: Collection[MappingKey] = frozenset(),
+) -> int:
+    """
+    Write a segment holding additions plus base's records not in exclude.
+
+    base is merged in its existing sort order rather than decoded and
+    re-sorted, so only the additions are materialized as Python objects.
+    The file is fsynced before returning; callers write to a temporary path
+    and os.replace() it into place. Returns the number of records written.
+    """
+    added = sorted(record_order(m) for m in additions)
+    base_rows = base._rows(exclude) if base is not None else iter(())
+    added_rows = (
+        (symbol, start, end, identifier, 1, i)
+        for i, (symbol, start, end, identifier) in enumerate(added)
+    )
+
+    # New record position of each merged row, by source: 0 = base, 1 = added.
+    positions = (
+        array("I", [0]) * (len(base) if base is not None else 0),
+        array("I", [0]) * len(added),
+    )
+    strings = io.BytesIO()
+
+    with open(path, "wb") as f:
+        f.write(bytes(HEADER.size))
+        count = 0
+        max_span = 0
+        last_symbol = None
+        for symbol, start, end, identifier, source, i in heapq.merge(
+            base_rows, added_rows
+        ):
+            if symbol != last_symbol:
+                offset = strings.tell()
+                strings.write(symbol)
+                last_symbol = symbol
+            f.write(RECORD.pack(identifier, start, end, offset, len(symbol)))
+            positions[source][i] = count
+            count += 1
+            stop = date.max.toordinal() if end == OPEN_END else end
+            max_span = max(max_span, stop - start)
+
+        index_offset = f.tell()
+        base_ids = base._identifier_order(exclude) if base is not None else iter(())
+        added_ids = sorted(
+            (identifier, start, 1, i)
+            for i, (_, start, _, identifier) in enumerate(added)
+        )
+        for _, _, source, i in heapq.merge(base_ids, added_ids):
+            f.write(POSITION.pack(positions[source][i]))
+
+        start_index_offset = f.tell()
+        base_starts = base._start_order(exclude) if base is not None else iter(())
+        added_starts = sorted((start, 1, i) for i, (_, start, _, _) in enumerate(added))
+        for _, source, i in heapq.merge(base_starts, added_starts):
+            f.write(POSITION.pack(positions[source][i]))
+
+        strings_offset = f.tell()
+        f.write(strings.getvalue())
+        f.seek(0)
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                count,
+                horizon.toordinal(),
+                index_offset,
+                start_index_offset,
+                strings_offset,
+                max_span,
+            )
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    return count
@@ -0,0 +1,705 @@
+"""
+Symbol-hash sharded deployment across local worker processes.
+
+Each shard is a separate process owning a MappingStorage for the symbols that
+hash to it, so inserts, saves and lookups for different shards run on
+different cores. The router in the server process keeps a small global
+identifier index (identifier → intervals and owning shard) so the
+cross-shard identifier uniqueness check of SymbologyServer.add_mapping still
+holds without asking every shard.
+
+With tiered storage the index only covers intervals that are open or ended
+after a horizon hot_days in the past, so its size tracks recent history
+like the shards' in-memory tiers do. Checks and lookups for earlier dates
+ask every shard instead.
+
+ShardedSymbologyServer exposes the same methods as SymbologyServer and can be
+passed to create_router() in its place.
+"""
+
+import logging
+import threading
+import zlib
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from dataclasses import replace
+from datetime import date, timedelta
+from itertools import count, islice
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from src.domain import SymbologyServer, check_disjoint
+from src.exceptions import (
+    ConflictError,
+    NotFoundError,
+    NotReadyError,
+    SymbologyError,
+)
+from src.models import (
+    AddOperation,
+    LoadStatus,
+    Mapping,
+    Operation,
+    TerminateOperation,
+)
+from src.storage import DEFAULT_HOT_DAYS, DEFAULT_SPILL_INTERVAL, MappingStorage
+
+logger = logging.getLogger(__name__)
+
+# Per-identifier index entry: [start_date, end_date or None, shard].
+Interval = list
+
+# Rows per message when streaming an export out of a shard.
+EXPORT_CHUNK_ROWS = 10_000
+
+
+def shard_for(symbol: str, shards: int) -> int:
+    """Stable shard number for symbol (unlike hash(), identical in every process)."""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+def _active(intervals: list[Interval], query_date: date) -> Interval | None:
+    for interval in intervals:
+        start, end, _ = interval
+        if start <= query_date and (end is None or end > query_date):
+            return interval
+    return None
+
+
+def _identifier_conflict(identifier: int, start_date: date) -> ConflictError:
+    return ConflictError(
+        f"Identifier '{identifier}' is already assigned on {start_date}. "
+        "Terminate it before reassignment."
+    )
+
+
+class _Aborted(Exception):
+    pass
+
+
+class _HorizonMoved(Exception):
+    """The index was pruned while a transaction was checking older history."""
+
+
+class ShardWorker:
+    """Request handlers run inside a shard process against its own store."""
+
+    def __init__(self, storage: MappingStorage, conn: Connection):
+        self.storage = storage
+        self.domain = SymbologyServer(storage)
+        self.conn = conn
+        # Open exports by router-assigned id, read a chunk per request.
+        self._exports: dict[int, Iterator[Mapping]] = {}
+
+    def identifier_intervals(
+        self, horizon: date
+    ) -> list[tuple[int, date, date | None]]:
+        """Intervals of mappings that are open or end after horizon."""
+        return [
+            (m.identifier, m.start_date, m.end_date)
+            for m in self.storage.get_mappings_between(horizon, date.max)
+        ]
+
+    def add_mapping(self, symbol: str, identifier: int, start_date: date) -> None:
+        self.domain.add_mapping(symbol, identifier, start_date)
+
+    def terminate_mapping(self, symbol: str, end_date: date) -> Mapping:
+        """Terminate and return a copy of the mapping for the router's index."""
+        mapping = self.storage.find_active_by_symbol(symbol, end_date)
+        self.domain.terminate_mapping(symbol, end_date)
+        return replace(mapping)
+
+    def lookup(self, symbol: str, query_date: date) -> Mapping:
+        return self.domain.lookup(symbol, query_date)
+
+    def find_by_identifier(self, identifier: int, query_date: date) -> Mapping | None:
+        return self.storage.find_active_by_identifier(identifier, query_date)
+
+    def get_mappings_between(self, begin: date, end: date) -> list[Mapping]:
+        return self.domain.get_mappings_between(begin, end)
+
+    def store_revision(self) -> str:
+        return self.domain.store_revision()
+
+    def open_export(self, export_id: int) -> str:
+        revision, rows = self.domain.export_rows()
+        self._exports[export_id] = rows
+        return revision
+
+    def export_chunk(self, export_id: int, size: int) -> list[Mapping]:
+        """Up to size rows of an open export; fewer means it is finished."""
+        rows = list(islice(self._exports[export_id], size))
+        if len(rows) < size:
+            del self._exports[export_id]
+        return rows
+
+    def close_export(self, export_id: int) -> None:
+        self._exports.pop(export_id, None)
+
+    def _await_commit(self, reply: object) -> None:
+        """Reply to a prepare, then block for the router's decision."""
+        self.conn.send(("ok", reply))
+        decision, _ = self.conn.recv()
+        if decision != "commit":
+            raise _Aborted()
+
+    def prepare_import(self, mappings: list[Mapping]) -> None:
+        """Stage this shard's part of an import and hold it, like prepare()."""
+        try:
+            with self.storage.transaction() as staged:
+                SymbologyServer(staged).import_mappings(mappings)
+                self._await_commit(None)
+        except _Aborted:
+            pass
+
+    def prepare(self, operations: list[tuple[int, Operation]]) -> None:
+        """
+        Validate this shard's part of a transaction and hold it staged.
+
+        Replies with the (identifier, start_date) of each mapping terminated,
+        keyed by the operation's position in the whole batch, then blocks for
+        the router's "commit" or "abort".
+        """
+        try:
+            with self.storage.transaction() as staged:
+                batch = SymbologyServer(staged)
+                terminated = {}
+                for position, op in operations:
+                    try:
+                        if isinstance(op, TerminateOperation):
+                            mapping = staged.find_active_by_symbol(
+                                op.symbol, op.end_date
+                            )
+                            batch.terminate_mapping(op.symbol, op.end_date)
+                            terminated[position] = (
+                                mapping.identifier,
+                                mapping.start_date,
+                            )
+                        else:
+                            batch.add_mapping(op.symbol, op.identifier, op.start_date)
+                    except SymbologyError as exc:
+                        raise type(exc)(f"Operation {position}: {exc}") from exc
+                self._await_commit(terminated)
+        except _Aborted:
+            pass
+
+
+def _serve_shard(conn: Connection, storage_kwargs: dict) -> None:
+    """Worker process main loop: one request at a time, in arrival order."""
+    storage = MappingStorage(**storage_kwargs)
+    worker = ShardWorker(storage, conn)
+    while True:
+        try:
+            method, args = conn.recv()
+        except EOFError:
+            break
+        if method == "close":
+            storage.close()
+            conn.send(("ok", None))
+            break
+        try:
+            conn.send(("ok", getattr(worker, method)(*args)))
+        # The router re-raises whatever a handler raised; the worker must
+        # keep serving its other requests.
+        except Exception as exc:  # noqa: BLE001
+            conn.send(("error", exc))
+
+
+class ShardedSymbologyServer:
+    def __init__(
+        self,
+        shards: int,
+        persist_file: str | None = None,
+        cold_file: str | None = None,
+        hot_days: int = DEFAULT_HOT_DAYS,
+        prune_interval: float | None = DEFAULT_SPILL_INTERVAL,
+    ):
+        """
+        Shard i persists to "<persist_file>.<i>" (and "<cold_file>.<i>" for
+        tiered storage) when those are given. Call start() to launch the
+        workers; the store is not ready until every shard has loaded.
+
+        With cold_file, prune_index() runs every prune_interval seconds on a
+        daemon thread (None disables this).
+        """
+        self.shards = shards
+        self.tiered = cold_file is not None
+        self.hot_days = hot_days
+        self.prune_interval = prune_interval
+        self._storage_kwargs = [
+            {
+                "persist_file": f"{persist_file}.{i}" if persist_file else None,
+                "cold_file": f"{cold_file}.{i}" if cold_file else None,
+                "hot_days": hot_days,
+            }
+            for i in range(shards)
+        ]
+        self._conns: list[Connection] = []
+        self._processes = []
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._index: dict[int, list[Interval]] = {}
+        # Intervals that ended on or before this may be missing from _index.
+        self._horizon = date.min
+        self._index_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._closed = threading.Event()
+        self._export_ids = count()
+        self._status = LoadStatus(state="pending")
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        """Launch shard processes and build the identifier index in the background."""
+        context = get_context("spawn")
+        for kwargs in self._storage_kwargs:
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_serve_shard, args=(child, kwargs), daemon=True
+            )
+            process.start()
+            self._conns.append(parent)
+            self._processes.append(process)
+        self._status = LoadStatus(state="loading")
+        threading.Thread(
+            target=self._build_index, name="shard-indexer", daemon=True
+        ).start()
+
+    def _default_horizon(self) -> date:
+        if not self.tiered:
+            return date.min
+        return date.today() - timedelta(days=self.hot_days)
+
+    def _build_index(self) -> None:
+        horizon = self._default_horizon()
+        try:
+            for shard in range(self.shards):
+                intervals = self._call(shard, "identifier_intervals", horizon)
+                with self._index_lock:
+                    for identifier, start, end in intervals:
+                        self._index.setdefault(identifier, []).append(
+                            [start, end, shard]
+                        )
+                self._status.loaded += len(intervals)
+        except Exception:
+            self._status.state = "failed"
+            raise
+        self._horizon = horizon
+        self._status.total = self._status.loaded
+        self._status.state = "ready"
+        self._ready.set()
+
+        if self.tiered and self.prune_interval:
+            threading.Thread(
+                target=self._prune_periodically, name="index-pruner", daemon=True
+            ).start()
+
+    def prune_index(self, horizon: date | None = None) -> int:
+        """
+        Drop index intervals that ended on or before horizon.
+
+        horizon defaults to hot_days before today and never moves backwards.
+        Returns the number of intervals dropped.
+        """
+        if horizon is None:
+            horizon = self._default_horizon()
+        dropped = 0
+        with self._index_lock:
+            horizon = max(horizon, self._horizon)
+            for identifier, intervals in list(self._index.items()):
+                kept = [i for i in intervals if i[1] is None or i[1] > horizon]
+                dropped += len(intervals) - len(kept)
+                if kept:
+                    self._index[identifier] = kept
+                else:
+                    del self._index[identifier]
+            self._horizon = horizon
+        return dropped
+
+    def _prune_periodically(self) -> None:
+        while not self._closed.wait(self.prune_interval):
+            try:
+                self.prune_index()
+            except Exception:
+                logger.exception("Pruning the identifier index failed")
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def close(self) -> None:
+        self._closed.set()
+        for shard, process in enumerate(self._processes):
+            if process.is_alive():
+                self._call(shard, "close")
+            process.join()
+
+    def load_status(self) -> LoadStatus:
+        return LoadStatus(self._status.state, self._status.loaded, self._status.total)
+
+    def _ensure_ready(self) -> None:
+        if not self._ready.is_set():
+            raise NotReadyError(
+                f"Store is not ready ({self._status.state}, "
+                f"{self._status.loaded} mappings indexed)."
+            )
+
+    # ── Shard RPC ─────────────────────────────────────────────────────────────
+
+    def _call(self, shard: int, method: str, *args):
+        with self._locks[shard]:
+            self._conns[shard].send((method, args))
+            return self._reply(shard)
+
+    def _reply(self, shard: int):
+        status, payload = self._conns[shard].recv()
+        if status == "error":
+            raise payload
+        return payload
+
+    def _collect(self, shards: Iterable[int]) -> list:
+        """
+        Read one reply from each shard, then raise the first error, if any.
+        Every reply is drained first so no pipe is left with an unread one.
+        """
+        replies = [self._conns[shard].recv() for shard in shards]
+        for status, payload in replies:
+            if status == "error":
+                raise payload
+        return [payload for _, payload in replies]
+
+    def _shard_for(self, symbol: str) -> int:
+        return shard_for(symbol, self.shards)
+
+    def _find_in_history(self, identifier: int, query_date: date) -> Mapping | None:
+        """Ask every shard for identifier's mapping on a date before the horizon."""
+        for mapping in self._broadcast("find_by_identifier", identifier, query_date):
+            if mapping is not None:
+                return mapping
+        return None
+
+    # ── Domain API ────────────────────────────────────────────────────────────
+
+    def add_mapping(self, symbol: str, identifier: int, start_date: date) -> None:
+        """
+        Reserve identifier in the global index, then insert on symbol's shard.
+
+        The shard enforces the symbol check; the reservation is released if
+        the shard rejects the mapping.
+        """
+        self._ensure_ready()
+        shard = self._shard_for(symbol)
+        while True:
+            # Intervals missing from the index ended before the horizon and
+            # can only shrink, so they can be checked before taking the lock,
+            # as long as no prune moves the horizon in between.
+            horizon = self._horizon
+            if start_date < horizon and self._find_in_history(identifier, start_date):
+                raise _identifier_conflict(identifier, start_date)
+            with self._index_lock:
+                if self._horizon != horizon:
+                    continue
+                if _active(self._index.get(identifier, []), start_date):
+                    raise _identifier_conflict(identifier, start_date)
+                reservation = [start_date, None, shard]
+                self._index.setdefault(identifier, []).append(reservation)
+                break
+        try:
+            self._call(shard, "add_mapping", symbol, identifier, start_date)
+        except BaseException:
+            with self._index_lock:
+                self._release(identifier, reservation)
+            raise
+
+    def _release(self, identifier: int, reservation: Interval) -> None:
+        # A reservation ended by its own transaction may have been pruned.
+        intervals = self._index.get(identifier, [])
+        intervals[:] = [i for i in intervals if i is not reservation]
+        if not intervals:
+            self._index.pop(identifier, None)
+
+    def terminate_mapping(self, symbol: str, end_date: date) -> None:
+        self._ensure_ready()
+        shard = self._shard_for(symbol)
+        mapping = self._call(shard, "terminate_mapping", symbol, end_date)
+        with self._index_lock:
+            for interval in self._index.get(mapping.identifier, []):
+                if interval[0] == mapping.start_date and interval[2] == shard:
+                    interval[1] = end_date
+                    break
+
+    def apply_transaction(self, operations: list[Operation]) -> None:
+        """
+        Apply a batch across shards with a prepare/commit round.
+
+        Each involved shard validates and stages its operations (symbol rules
+        are shard-local because a symbol lives on one shard); the router then
+        replays the batch against the identifier index for cross-shard
+        identifier rules and tells every shard to commit or abort. Each shard
+        persists once. Readers see each shard's part atomically, but may see
+        one shard committed slightly before another. The index lock is not
+        held while shards commit; the batch's new intervals are reserved
+        first and released for any shard whose commit fails.
+        """
+        self._ensure_ready()
+        by_shard: dict[int, list[tuple[int, Operation]]] = {}
+        for position, op in enumerate(operations):
+            by_shard.setdefault(self._shard_for(op.symbol), []).append((position, op))
+        while True:
+            try:
+                return self._apply(operations, by_shard)
+            except _HorizonMoved:
+                continue
+
+    def _apply(
+        self,
+        operations: list[Operation],
+        by_shard: dict[int, list[tuple[int, Operation]]],
+    ) -> None:
+        # Intervals before the horizon that the batch's adds could collide
+        # with, fetched before any shard is locked (as in add_mapping).
+        horizon = self._horizon
+        history: dict[int, list[Interval]] = {}
+        for op in operations:
+            if isinstance(op, AddOperation) and op.start_date < horizon:
+                mapping = self._find_in_history(op.identifier, op.start_date)
+                if mapping is not None:
+                    history.setdefault(op.identifier, []).append(
+                        [
+                            mapping.start_date,
+                            mapping.end_date,
+                            self._shard_for(mapping.symbol),
+                        ]
+                    )
+
+        with ExitStack() as stack:
+            for shard in sorted(by_shard):
+                stack.enter_context(self._locks[shard])
+            prepared = []
+            try:
+                terminated = {}
+                for shard in sorted(by_shard):
+                    self._conns[shard].send(("prepare", (by_shard[shard],)))
+                    terminated.update(self._reply(shard))
+                    prepared.append(shard)
+                with self._index_lock:
+                    if self._horizon != horizon:
+                        raise _HorizonMoved()
+                    changes = self._replay(operations, by_shard, terminated, history)
+                    # New intervals are reserved before the shards commit, as
+                    # in add_mapping; ended ones are shortened once they have.
+                    for identifier, staged, live in changes:
+                        if live is staged:
+                            self._index.setdefault(identifier, []).append(staged)
+                # Commits, and their saves, run without the index lock, so
+                # adds and lookups on every shard carry on meanwhile.
+                committing, prepared = prepared, []
+                for shard in committing:
+                    self._conns[shard].send(("commit", None))
+                replies = [self._conns[shard].recv() for shard in committing]
+                failed = {
+                    shard
+                    for shard, (status, _) in zip(committing, replies)
+                    if status == "error"
+                }
+                with self._index_lock:
+                    for identifier, staged, live in changes:
+                        if staged[2] in failed:
+                            if live is staged:
+                                self._release(identifier, staged)
+                        elif live is not staged:
+                            live[1] = staged[1]
+                for status, payload in replies:
+                    if status == "error":
+                        raise payload
+            finally:
+                for shard in prepared:
+                    self._conns[shard].send(("abort", None))
+                self._collect(prepared)
+
+    def _replay(
+        self,
+        operations: list[Operation],
+        by_shard: dict[int, list[tuple[int, Operation]]],
+        terminated: dict[int, tuple[int, date]],
+        history: dict[int, list[Interval]],
+    ) -> list[tuple[int, Interval, Interval]]:
+        """
+        Check identifier rules over the batch against staged index entries.
+
+        Returns (identifier, staged, live) for each interval the batch adds
+        or ends: live is the index entry to update with staged's end date, or
+        staged itself for an interval to add. Live entries are not modified,
+        so those pending in a concurrent add_mapping stay releasable.
+        """
+        shard_of = {
+            position: shard for shard, ops in by_shard.items() for position, _ in ops
+        }
+        # identifier → [(staged copy, live entry, or None for history)]
+        staged: dict[int, list[tuple[Interval, Interval | None]]] = {}
+        changes: list[tuple[int, Interval, Interval]] = []
+
+        def entries(identifier: int) -> list[tuple[Interval, Interval | None]]:
+            if identifier not in staged:
+                live = self._index.get(identifier, [])
+                staged[identifier] = [(list(i), i) for i in live] + [
+                    (i, None)
+                    for i in history.get(identifier, [])
+                    if not any(i[0] == j[0] and i[2] == j[2] for j in live)
+                ]
+            return staged[identifier]
+
+        for position, op in enumerate(operations):
+            if isinstance(op, TerminateOperation):
+                identifier, start = terminated[position]
+                for interval, live in entries(identifier):
+                    if interval[0] == start and interval[2] == shard_of[position]:
+                        interval[1] = op.end_date
+                        if live is not None and live is not interval:
+                            changes.append((identifier, interval, live))
+                        break
+            else:
+                pending = entries(op.identifier)
+                if _active([interval for interval, _ in pending], op.start_date):
+                    raise ConflictError(
+                        f"Operation {position}: "
+                        f"{_identifier_conflict(op.identifier, op.start_date)}"
+                    )
+                interval = [op.start_date, None, shard_of[position]]
+                pending.append((interval, interval))
+                changes.append((op.identifier, interval, interval))
+        return changes
+
+    def lookup(self, symbol: str, query_date: date) -> Mapping:
+        self._ensure_ready()
+        return self._call(self._shard_for(symbol), "lookup", symbol, query_date)
+
+    def get_identifier(self, symbol: str, query_date: date) -> int:
+        return self.lookup(symbol, query_date).identifier
+
+    def get_symbol(self, identifier: int, query_date: date) -> str:
+        self._ensure_ready()
+        with self._index_lock:
+            interval = _active(self._index.get(identifier, []), query_date)
+            horizon = self._horizon
+        mapping = None
+        if interval is not None:
+            mapping = self._call(
+                interval[2], "find_by_identifier", identifier, query_date
+            )
+        elif query_date < horizon:
+            mapping = self._find_in_history(identifier, query_date)
+        if not mapping:
+            raise NotFoundError(
+                f"No symbol found for identifier {identifier} on {query_date}."
+            )
+        return mapping.symbol
+
+    def get_mappings_between(self, begin: date, end: date) -> list[Mapping]:
+        """Fan the range query out to every shard in parallel and merge."""
+        self._ensure_ready()
+        results = self._broadcast("get_mappings_between", begin, end)
+        merged = [m for result in results for m in result]
+        merged.sort(key=lambda m: (m.start_date, m.symbol))
+        return merged
+
+    def store_revision(self) -> str:
+        return ".".join(self._broadcast("store_revision"))
+
+    def export_rows(self) -> tuple[str, Iterator[Mapping]]:
+        """
+        Open an export on every shard at one combined revision.
+
+        Rows are fetched from one shard at a time in chunks of
+        EXPORT_CHUNK_ROWS, so neither the router nor a shard holds all of
+        them at once. Close the returned iterator if it is not read to the end.
+        """
+        self._ensure_ready()
+        export_id = next(self._export_ids)
+        revisions = self._broadcast("open_export", export_id)
+        return ".".join(revisions), _ShardExport(self, export_id)
+
+    def import_mappings(self, mappings: list[Mapping]) -> int:
+        """
+        Bulk-load an empty sharded store with a prepare/commit round.
+
+        Overlaps are checked across the whole import up front. Every shard
+        then stages its part and checks it is empty, and the import commits
+        everywhere or aborts everywhere, with one save per shard. The
+        identifier index is built from the import.
+        """
+        self._ensure_ready()
+        check_disjoint(mappings)
+        by_shard: list[list[Mapping]] = [[] for _ in range(self.shards)]
+        for m in mappings:
+            by_shard[self._shard_for(m.symbol)].append(m)
+
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock)
+            stack.enter_context(self._index_lock)
+            # Also catches identifiers reserved by adds still in flight.
+            if self._index:
+                raise ConflictError(
+                    "Import requires an empty store; it already holds mappings."
+                )
+            prepared = []
+            try:
+                for shard in range(self.shards):
+                    self._conns[shard].send(("prepare_import", (by_shard[shard],)))
+                    self._reply(shard)
+                    prepared.append(shard)
+                committing, prepared = prepared, []
+                for shard in committing:
+                    self._conns[shard].send(("commit", None))
+                self._collect(committing)
+            finally:
+                for shard in prepared:
+                    self._conns[shard].send(("abort", None))
+                self._collect(prepared)
+            for shard in range(self.shards):
+                for m in by_shard[shard]:
+                    if m.end_date is None or m.end_date > self._horizon:
+                        self._index.setdefault(m.identifier, []).append(
+                            [m.start_date, m.end_date, shard]
+                        )
+        return len(mappings)
+
+    def _broadcast(self, method: str, *args) -> list:
+        """Send a request to every shard at once and collect replies in order."""
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock)
+            for conn in self._conns:
+                conn.send((method, args))
+            return self._collect(range(self.shards))
+
+
+class _ShardExport:
+    """Iterator over an export opened on every shard by export_rows()."""
+
+    def __init__(self, server: ShardedSymbologyServer, export_id: int):
+        self._server = server
+        self._export_id = export_id
+        self._rows = self._fetch()
+        self._closed = False
+
+    def _fetch(self) -> Iterator[Mapping]:
+        for shard in range(self._server.shards):
+            while True:
+                rows = self._server._call(
+                    shard, "export_chunk", self._export_id, EXPORT_CHUNK_ROWS
+                )
+                yield from rows
+                if len(rows) < EXPORT_CHUNK_ROWS:
+                    break
+
+    def __iter__(self) -> Iterator[Mapping]:
+        return self
+
+    def __next__(self) -> Mapping:
+        return next(self._rows)
+
+    def close(self) -> None:
+        """Release whatever the shards still hold for this export."""
+        if not self._closed:
+            self._closed = True
+            self._rows.close()
+            self._server._broadcast("close_export", self._export_id)
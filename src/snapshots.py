@@ -0,0 +1,207 @@
+"""
+Full-store export and import formats.
+
+Two formats are supported:
+
+    ndjson    gzip-compressed newline-delimited JSON, one mapping per line
+    segment   the binary, memory-mappable format from src.segment
+
+An export is written once per (format, store revision) to a file, so an
+interrupted download can be resumed from a byte offset against exactly the
+same bytes. Files are kept for a retention period after they were last
+requested, so a resume keeps working after the store has moved on.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date
+from typing import BinaryIO
+from src.exceptions import SnapshotExpiredError
+from src.models import Mapping
+from src.schemas import MappingResponse
+from src.segment import ColdSegment, write_segment
+
+MEDIA_TYPES = {
+    "ndjson": "application/gzip",
+    "segment": "application/octet-stream",
+}
+
+EXTENSIONS = {
+    "ndjson": "ndjson.gz",
+    "segment": "seg",
+}
+
+# Seconds an export file is kept after it was last requested.
+DEFAULT_RETENTION = 3600.0
+
+
+def write_ndjson(path: str, mappings: Iterable[Mapping]) -> None:
+    # mtime=0 keeps the gzip header, and so the bytes, stable across rebuilds.
+    with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        for m in mappings:
+            line = json.dumps(m.__dict__, default=str, separators=(",", ":"))
+            f.write(line.encode() + b"\n")
+
+
+def _parse_ndjson(path: str) -> Iterator[Mapping]:
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            # Strict: "7" is not an identifier and 7 is not a date.
+            row = MappingResponse.model_validate_json(line, strict=True)
+            yield Mapping(row.symbol, row.identifier, row.start_date, row.end_date)
+
+
+def read_rows(path: str, format: str) -> list[Mapping]:
+    """Parse an export file; raise ValueError if it is truncated or malformed."""
+    try:
+        rows = ColdSegment(path) if format == "segment" else _parse_ndjson(path)
+        mappings = []
+        for number, m in enumerate(rows, start=1):
+            if m.end_date is not None and m.end_date <= m.start_date:
+                raise ValueError(
+                    f"row {number} for '{m.symbol}' ends on {m.end_date}, "
+                    f"not after its start_date {m.start_date}"
+                )
+            mappings.append(m)
+        return mappings
+    except (OSError, EOFError, struct.error, ValueError) as exc:
+        raise ValueError(f"Invalid {format} snapshot: {exc}") from exc
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    revision: str
+    format: str
+    path: str
+    size: int
+
+
+class SnapshotExporter:
+    def __init__(
+        self,
+        current_revision: Callable[[], str],
+        export_rows: Callable[[], tuple[str, Iterator[Mapping]]],
+        directory: str | None = None,
+        retention: float = DEFAULT_RETENTION,
+    ):
+        """
+        current_revision and export_rows come from the domain. Export files
+        live in directory, or in a temporary directory created on the first
+        export and removed by close(). A file is deleted once it has not been
+        requested for retention seconds.
+        """
+        self._current_revision = current_revision
+        self._export_rows = export_rows
+        self.directory = directory
+        self._owns_directory = directory is None
+        self.retention = retention
+        self._snapshots: dict[tuple[str, str], Snapshot] = {}
+        self._last_used: dict[tuple[str, str], float] = {}
+        # Keys being built, set once the build has finished or failed.
+        self._building: dict[tuple[str, str], threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def open(
+        self, format: str, revision: str | None = None
+    ) -> tuple[Snapshot, BinaryIO]:
+        """
+        Return the export file for revision and an open handle to it,
+        building the file if needed. The caller closes the handle.
+
+        revision None means the current revision. Raises SnapshotExpiredError
+        if a specific revision is requested that is neither retained nor the
+        store's current revision. Files are built outside the lock, so
+        opening a built one never waits for another build; concurrent
+        requests for the same file wait for a single build.
+        """
+        while True:
+            with self._lock:
+                current = self._current_revision()
+                key = (format, revision or current)
+                snapshot = self._snapshots.get(key)
+                if snapshot is not None:
+                    return snapshot, self._use(key, snapshot)
+                if revision is not None and revision != current:
+                    raise SnapshotExpiredError(
+                        f"Revision {revision} is no longer available; "
+                        f"restart the export at revision {current}."
+                    )
+                building = self._building.get(key)
+                if building is None:
+                    building = self._building[key] = threading.Event()
+                    if self.directory is None:
+                        self.directory = tempfile.mkdtemp(prefix="symbology-export-")
+                    directory = self.directory
+                    break
+            building.wait()
+
+        try:
+            snapshot = self._build(format, revision, directory)
+        finally:
+            with self._lock:
+                del self._building[key]
+            building.set()
+        with self._lock:
+            # Keep the first file registered for a revision; both are the same.
+            key = (format, snapshot.revision)
+            snapshot = self._snapshots.setdefault(key, snapshot)
+            return snapshot, self._use(key, snapshot)
+
+    def _use(self, key: tuple[str, str], snapshot: Snapshot) -> BinaryIO:
+        """Mark key used and open its file; call with the lock held."""
+        now = time.monotonic()
+        self._last_used[key] = now
+        self._expire(now, keep=key)
+        # Opened under the lock, so no concurrent export can expire the file
+        # first; deleting it later does not affect the open handle.
+        return open(snapshot.path, "rb")
+
+    def _build(self, format: str, revision: str | None, directory: str) -> Snapshot:
+        current, rows = self._export_rows()
+        with closing(rows):
+            if revision is not None and revision != current:
+                # The store moved on after open() checked the revision.
+                raise SnapshotExpiredError(
+                    f"Revision {revision} is no longer available; "
+                    f"restart the export at revision {current}."
+                )
+            path = os.path.join(directory, f"{current}.{EXTENSIONS[format]}")
+            fd, staging = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            os.close(fd)
+            try:
+                if format == "segment":
+                    write_segment(staging, date.min, rows)
+                else:
+                    write_ndjson(staging, rows)
+            except BaseException:
+                os.remove(staging)
+                raise
+        os.replace(staging, path)
+        return Snapshot(current, format, path, os.path.getsize(path))
+
+    def _expire(self, now: float, keep: tuple[str, str]) -> None:
+        for key, used in list(self._last_used.items()):
+            if key != keep and now - used >= self.retention:
+                os.remove(self._snapshots.pop(key).path)
+                del self._last_used[key]
+
+    def close(self) -> None:
+        """Delete every export file, and the directory if it was created here."""
+        with self._lock:
+            for snapshot in self._snapshots.values():
+                if os.path.exists(snapshot.path):
+                    os.remove(snapshot.path)
+            self._snapshots.clear()
+            self._last_used.clear()
+            if self._owns_directory and self.directory is not None:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                self.directory = None
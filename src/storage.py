@@ -3,23 +3,307 @@ Storage layer for symbology mappings.
 
 This implementation stores all data in memory. It performs no domain-level
 validation; all symbology invariants are enforced by the domain layer.
+
+With a cold_file, storage is tiered: open-ended and recently terminated
+mappings stay in memory, while mappings terminated before a moving horizon
+are spilled to a memory-mapped segment (see src.segment) and only searched
+for query dates before that horizon.
 """
 
 import os
+import heapq
 import json
-from datetime import date
-from src.models import Mapping
+import logging
+import threading
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from itertools import chain
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from src.models import LoadStatus, Mapping
+from src.segment import (
+    ColdSegment,
+    MappingKey,
+    mapping_key,
+    record_order,
+    write_segment,
+)
+
+logger = logging.getLogger(__name__)
+
+# Terminated mappings stay in memory for this many days after their end_date.
+DEFAULT_HOT_DAYS = 365
+
+# Seconds between background spills in tiered mode.
+DEFAULT_SPILL_INTERVAL = 300.0
+
+
+@dataclass(frozen=True)
+class ColdTier:
+    """
+    The on-disk segment plus the keys of records superseded in memory.
+
+    A record is masked when its mapping has been re-terminated after spilling
+    (or survived a crash between writing the segment and saving the hot file);
+    the in-memory copy is then authoritative until the next spill drops it.
+    """
+
+    segment: ColdSegment
+    masked: frozenset[MappingKey] = frozenset()
+
+    def covers(self, query_date: date) -> bool:
+        """Cold records all end on or before the horizon, so later dates miss."""
+        return query_date < self.segment.horizon
 
 
 class MappingStorage:
-    def __init__(self, persist_file: str | None = None):
+    def __init__(
+        self,
+        persist_file: str | None = None,
+        autoload: bool = True,
+        cold_file: str | None = None,
+        hot_days: int = DEFAULT_HOT_DAYS,
+        spill_interval: float | None = DEFAULT_SPILL_INTERVAL,
+    ):
+        """
+        If autoload is False the persist file is not read here; call load() or
+        start_background_load() before serving requests.
+
+        Passing cold_file enables tiered storage. Once loaded, spill() runs
+        every spill_interval seconds on a daemon thread (None disables this).
+        """
         self._mappings: list[Mapping] = []
+        self._cold: ColdTier | None = None
         self.persist_file = persist_file
-        self.load()
+        self.cold_file = cold_file
+        self.hot_days = hot_days
+        self.spill_interval = spill_interval
+        # Bumped by every committed write. Together with instance_id (revision
+        # counts restart from zero on every load) it names a point-in-time
+        # state of the store.
+        self.revision = 0
+        self.instance_id = uuid.uuid4().hex[:12]
+        self.write_lock = threading.RLock()
+        # Guards swapping the hot list and cold tier together, so readers
+        # never see a mapping in both tiers or in neither.
+        self._swap_lock = threading.Lock()
+        # Serializes spill(), which writes the segment outside write_lock.
+        self._spill_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._closed = threading.Event()
+        self._spiller: threading.Thread | None = None
+        self._status = LoadStatus(state="pending")
+        if autoload:
+            self.load()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def load_status(self) -> LoadStatus:
+        return LoadStatus(self._status.state, self._status.loaded, self._status.total)
+
+    def start_background_load(self) -> threading.Thread:
+        """Run load() on a daemon thread and return the thread."""
+        thread = threading.Thread(
+            target=self._load_in_background, name="mapping-loader", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _load_in_background(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            self._status.state = "failed"
+            raise
+
+    def close(self) -> None:
+        """Stop the background spiller, if running."""
+        self._closed.set()
+        if self._spiller is not None:
+            self._spiller.join()
+
+    def _tiers(self) -> tuple[list[Mapping], ColdTier | None]:
+        with self._swap_lock:
+            return self._mappings, self._cold
+
+    def _cold_candidates(
+        self,
+        cold: ColdTier | None,
+        query_date: date,
+        search: Callable[[ColdSegment], Iterator[Mapping]],
+    ) -> Iterator[Mapping]:
+        """Unmasked cold mappings from search, if query_date reaches the cold tier."""
+        if cold is None or not cold.covers(query_date):
+            return
+        for m in search(cold.segment):
+            if mapping_key(m) not in cold.masked:
+                yield m
 
     def insert(self, symbol: str, identifier: int, start_date: date) -> None:
-        self._mappings.append(Mapping(symbol, identifier, start_date))
-        self.save()
+        with self.write_lock:
+            self._mappings.append(Mapping(symbol, identifier, start_date))
+            self.revision += 1
+            self.save()
+
+    def bulk_insert(self, mappings: list[Mapping]) -> None:
+        """Add many mappings at once, visible together and saved once."""
+        with self.write_lock:
+            hot, _ = self._tiers()
+            with self._swap_lock:
+                self._mappings = hot + mappings
+            self.revision += 1
+            self.save()
+
+    def is_empty(self) -> bool:
+        hot, cold = self._tiers()
+        return not hot and (cold is None or len(cold.segment) == 0)
+
+    def export_rows(self) -> tuple[int, Iterator[Mapping]]:
+        """
+        Return the current revision and every mapping as of that revision.
+
+        In-memory mappings are copied under the write lock; cold mappings are
+        read lazily from the segment, which is immutable once written. Rows
+        come in segment record order whichever tier holds them, since spill()
+        moves rows between tiers without changing the revision.
+        """
+        with self.write_lock:
+            hot, cold = self._tiers()
+            revision = self.revision
+            rows = sorted((replace(m) for m in hot), key=record_order)
+
+        def iterate() -> Iterator[Mapping]:
+            spilled = ()
+            if cold is not None:
+                spilled = (m for m in cold.segment if mapping_key(m) not in cold.masked)
+            yield from heapq.merge(rows, spilled, key=record_order)
+
+        return revision, iterate()
+
+    def terminate(self, mapping: Mapping, end_date: date) -> None:
+        """
+        Set mapping's end_date and persist it.
+
+        mapping must have come from one of the find methods. If it was read
+        from the cold segment, it is moved back into memory and the segment
+        record is masked until the next spill rewrites it.
+        """
+        with self.write_lock:
+            hot, cold = self._tiers()
+            key = mapping_key(mapping)
+            mapping.end_date = end_date
+            if (
+                cold is not None
+                and key not in cold.masked
+                and cold.segment.contains(key)
+            ):
+                # Publish a new hot list rather than appending, so a reader
+                # still holding the old tiers cannot see the mapping in both.
+                with self._swap_lock:
+                    self._mappings = hot + [mapping]
+                    self._cold = ColdTier(cold.segment, cold.masked | {key})
+            self.revision += 1
+            self.save()
+
+    @contextmanager
+    def transaction(self) -> Iterator["MappingStorage"]:
+        """
+        Stage a batch of writes on top of the store without touching it.
+
+        Yields an unpersisted MappingStorage that holds only the rows the
+        batch adds or terminates and reads through to the live mappings for
+        everything else. If the block exits cleanly, the staged rows are
+        merged into a new mapping list that replaces the live one in a single
+        reference swap and is saved once; if it raises, they are discarded.
+        Other writers are blocked until the block exits, and readers see
+        either the old state or the new one, never a mix.
+        """
+        with self.write_lock:
+            hot, cold = self._tiers()
+            staged = _StagedStorage(hot, cold)
+            yield staged
+            if staged._replaced:
+                hot = [staged._replaced.get(id(m), m) for m in hot]
+            with self._swap_lock:
+                self._mappings = hot + staged._added
+                self._cold = staged._cold
+            self.revision += 1
+            self.save()
+
+    def spill(self, horizon: date | None = None) -> int:
+        """
+        Move mappings that ended on or before horizon to the cold segment.
+
+        horizon defaults to hot_days before today and never moves backwards.
+        The existing segment and the spilled mappings are merged into a new
+        file that atomically replaces the old one; readers holding the old
+        segment keep using it until they finish. Returns the number spilled.
+
+        The merge is written from a snapshot without holding write_lock, so
+        writers only wait for the swap. A spilled mapping terminated again in
+        the meantime stays in memory with its new segment record masked, as
+        does one promoted from the old segment.
+        """
+        if not self.cold_file:
+            return 0
+        if horizon is None:
+            horizon = date.today() - timedelta(days=self.hot_days)
+        with self._spill_lock:
+            with self.write_lock:
+                hot, cold = self._tiers()
+                if cold is not None:
+                    horizon = max(horizon, cold.segment.horizon)
+                spilled = [m for m in hot if m.end_date and m.end_date <= horizon]
+                if not spilled and cold is not None and not cold.masked:
+                    return 0
+                rows = [replace(m) for m in spilled]
+
+            staging_file = self.cold_file + ".tmp"
+            write_segment(
+                staging_file,
+                horizon,
+                rows,
+                base=cold.segment if cold is not None else None,
+                exclude=cold.masked if cold is not None else frozenset(),
+            )
+
+            with self.write_lock:
+                hot, current = self._tiers()
+                live = {id(m) for m in hot}
+                # Rows still in the hot list as they were written can go; the
+                # rest were terminated again, in place or by a transaction.
+                unchanged = {
+                    id(m)
+                    for m, row in zip(spilled, rows)
+                    if id(m) in live and m.end_date == row.end_date
+                }
+                masked = {
+                    mapping_key(row)
+                    for m, row in zip(spilled, rows)
+                    if id(m) not in unchanged
+                }
+                if current is not None and cold is not None:
+                    masked |= current.masked - cold.masked
+                os.replace(staging_file, self.cold_file)
+                segment = ColdSegment(self.cold_file)
+                # A crash before the save below leaves spilled mappings in
+                # both files; load() masks the segment copies until the next
+                # spill.
+                with self._swap_lock:
+                    self._cold = ColdTier(segment, frozenset(masked))
+                    self._mappings = [m for m in hot if id(m) not in unchanged]
+                self.save()
+        return len(spilled)
+
+    def _spill_periodically(self) -> None:
+        while not self._closed.wait(self.spill_interval):
+            try:
+                self.spill()
+            except Exception:
+                logger.exception("Spilling to %s failed", self.cold_file)
 
     def save(self) -> None:
         if not self.persist_file:
@@ -28,37 +312,80 @@ class MappingStorage:
             json.dump([m.__dict__ for m in self._mappings], f, default=str)
 
     def load(self) -> None:
-        if not self.persist_file or not os.path.exists(self.persist_file):
-            return
-        with open(self.persist_file, "r") as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                data = []
-        self._mappings = [
-            Mapping(
-                symbol=item["symbol"],
-                identifier=item["identifier"],
-                start_date=date.fromisoformat(item["start_date"]),
-                end_date=(
-                    date.fromisoformat(item["end_date"]) if item["end_date"] else None
-                ),
+        """
+        Read the persist file into memory, then mark the store ready.
+
+        Progress is published through load_status() as records are converted,
+        so a readiness probe can report it while this runs on another thread.
+        """
+        self._status = LoadStatus(state="loading")
+        data = []
+        if self.persist_file and os.path.exists(self.persist_file):
+            with open(self.persist_file, "r") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    data = []
+        self._status.total = len(data)
+
+        mappings = []
+        for item in data:
+            mappings.append(
+                Mapping(
+                    symbol=item["symbol"],
+                    identifier=item["identifier"],
+                    start_date=date.fromisoformat(item["start_date"]),
+                    end_date=(
+                        date.fromisoformat(item["end_date"])
+                        if item["end_date"]
+                        else None
+                    ),
+                )
+            )
+            self._status.loaded += 1
+
+        cold = None
+        if self.cold_file and os.path.exists(self.cold_file):
+            segment = ColdSegment(self.cold_file)
+            masked = frozenset(
+                mapping_key(record)
+                for m in mappings
+                if m.end_date
+                for record in segment.by_symbol(m.symbol)
+                if _supersedes(m, record)
+            )
+            cold = ColdTier(segment, masked)
+
+        with self.write_lock, self._swap_lock:
+            self._mappings = mappings
+            self._cold = cold
+        self._status.state = "ready"
+        self._ready.set()
+
+        if self.cold_file and self.spill_interval and self._spiller is None:
+            self._spiller = threading.Thread(
+                target=self._spill_periodically, name="mapping-spiller", daemon=True
             )
-            for item in data
-        ]
+            self._spiller.start()
 
     def find_active_by_symbol(self, symbol: str, query_date: date) -> Mapping | None:
         """
         Return the active mapping for a symbol on a given date, or None.
         A mapping is active on the half-open interval [start_date, end_date).
         """
-        for m in self._mappings:
+        hot, cold = self._tiers()
+        for m in hot:
             if (
                 m.symbol == symbol
                 and m.start_date <= query_date
                 and (m.end_date is None or m.end_date > query_date)
             ):
                 return m
+        for m in self._cold_candidates(
+            cold, query_date, lambda segment: segment.by_symbol(symbol)
+        ):
+            if m.start_date <= query_date < m.end_date:
+                return m
         return None
 
     def find_active_by_identifier(
@@ -68,13 +395,19 @@ class MappingStorage:
         Return the active mapping for an identifier on a given date, or None.
         A mapping is active on the half-open interval [start_date, end_date).
         """
-        for m in self._mappings:
+        hot, cold = self._tiers()
+        for m in hot:
             if (
                 m.identifier == identifier
                 and m.start_date <= query_date
                 and (m.end_date is None or m.end_date > query_date)
             ):
                 return m
+        for m in self._cold_candidates(
+            cold, query_date, lambda segment: segment.by_identifier(identifier)
+        ):
+            if m.start_date <= query_date < m.end_date:
+                return m
         return None
 
     def get_mappings_between(self, begin: date, end: date) -> list[Mapping]:
@@ -82,9 +415,87 @@ class MappingStorage:
         Return all mappings that overlap the half-open date range [begin, end).
         A mapping overlaps if its start_date < end and its end_date (or infinity) > begin.
         """
+        hot, cold = self._tiers()
         result = []
-        for m in self._mappings:
+        for m in hot:
             mapping_end = m.end_date or date.max
             if m.start_date < end and mapping_end > begin:
                 result.append(m)
+        result.extend(
+            self._cold_candidates(
+                cold, begin, lambda segment: segment.overlapping(begin, end)
+            )
+        )
         return result
+
+
+def _supersedes(mapping: Mapping, record: Mapping) -> bool:
+    """
+    Whether terminated in-memory mapping replaces segment record on load.
+
+    It does if the record is the same row, left in both files by a crash in
+    spill(), or the row as it was before terminate() promoted and shortened
+    it. Both share symbol, identifier and start_date and end no earlier than
+    mapping; a zero-length record can only match itself.
+    """
+    return (
+        record.identifier == mapping.identifier
+        and record.start_date == mapping.start_date
+        and record.end_date >= mapping.end_date
+    )
+
+
+class _StagedStorage(MappingStorage):
+    """
+    The writes of one transaction(), overlaid on the live store's tiers.
+
+    Added mappings and copies of terminated live mappings are kept here; the
+    live mappings they supersede are skipped on reads and never mutated.
+    """
+
+    def __init__(self, hot: list[Mapping], cold: ColdTier | None):
+        super().__init__()
+        self._live = hot
+        self._cold = cold
+        self._added: list[Mapping] = []
+        # id() of a live mapping → its staged, terminated copy.
+        self._replaced: dict[int, Mapping] = {}
+        self._staged_ids: set[int] = set()
+
+    def _stage(self, mapping: Mapping) -> Mapping:
+        self._staged_ids.add(id(mapping))
+        return mapping
+
+    def _tiers(self) -> tuple[Iterable[Mapping], ColdTier | None]:
+        live: Iterable[Mapping] = self._live
+        if self._replaced:
+            live = (m for m in self._live if id(m) not in self._replaced)
+        return chain(self._added, self._replaced.values(), live), self._cold
+
+    def insert(self, symbol: str, identifier: int, start_date: date) -> None:
+        self._added.append(self._stage(Mapping(symbol, identifier, start_date)))
+
+    def bulk_insert(self, mappings: list[Mapping]) -> None:
+        self._added.extend(self._stage(m) for m in mappings)
+
+    def is_empty(self) -> bool:
+        cold = self._cold
+        return (
+            not self._added
+            and not self._live
+            and (cold is None or len(cold.segment) == 0)
+        )
+
+    def terminate(self, mapping: Mapping, end_date: date) -> None:
+        key = mapping_key(mapping)
+        cold = self._cold
+        if id(mapping) in self._staged_ids:
+            mapping.end_date = end_date
+        elif cold is not None and key not in cold.masked and cold.segment.contains(key):
+            # Promoted from the cold segment, as in MappingStorage.terminate().
+            self._cold = ColdTier(cold.segment, cold.masked | {key})
+            self._added.append(self._stage(replace(mapping, end_date=end_date)))
+        else:
+            self._replaced[id(mapping)] = self._stage(
+                replace(mapping, end_date=end_date)
+            )
@@ -3,6 +3,7 @@ Shared pytest fixtures for the symbology server test suite.
 """
 
 import pytest
+from collections.abc import Iterator
 from fastapi.testclient import TestClient
 from src.domain import SymbologyServer
 from src.storage import MappingStorage
@@ -20,6 +21,8 @@ def domain(storage: MappingStorage) -> SymbologyServer:
 
 
 @pytest.fixture
-def client(storage: MappingStorage) -> TestClient:
+def client(storage: MappingStorage) -> Iterator[TestClient]:
     app = create_app(storage)
-    return TestClient(app)
+    # Entering the client runs the app's startup and shutdown hooks.
+    with TestClient(app) as client:
+        yield client
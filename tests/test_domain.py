@@ -10,12 +10,15 @@ from HTTP and storage concerns, including:
     - Reassignment after explicit termination
     - Reverse lookup (identifier → symbol)
     - Date-range queries
+    - Atomic transactions
+    - Bulk import
 """
 
 import pytest
 from datetime import date
 from src.domain import SymbologyServer
 from src.exceptions import ConflictError, NotFoundError
+from src.models import AddOperation, Mapping, TerminateOperation
 
 # ── Basic add and lookup ──────────────────────────────────────────────────────
 
@@ -127,3 +130,74 @@ def test_get_mappings_between_excludes_non_overlapping(domain: SymbologyServer):
 
     results = domain.get_mappings_between(date(2024, 1, 10), date(2024, 1, 20))
     assert results == []
+
+
+# ── Transactions ──────────────────────────────────────────────────────────────
+
+
+def test_transaction_renames_symbol(domain: SymbologyServer):
+    """A rename can hand the old symbol's identifier to the new symbol."""
+    domain.add_mapping("FB", 7, date(2020, 1, 1))
+    domain.apply_transaction(
+        [
+            TerminateOperation("FB", date(2022, 6, 9)),
+            AddOperation("META", 7, date(2022, 6, 9)),
+        ]
+    )
+    assert domain.get_identifier("FB", date(2022, 6, 8)) == 7
+    assert domain.get_symbol(7, date(2022, 6, 9)) == "META"
+
+
+def test_transaction_validates_against_batch_state(domain: SymbologyServer):
+    """Adding the same symbol twice in one batch conflicts with itself."""
+    with pytest.raises(ConflictError, match="Operation 1"):
+        domain.apply_transaction(
+            [
+                AddOperation("AAPL", 1, date(2024, 1, 1)),
+                AddOperation("AAPL", 2, date(2024, 1, 2)),
+            ]
+        )
+
+
+def test_failed_transaction_applies_nothing(domain: SymbologyServer):
+    domain.add_mapping("AAPL", 1, date(2024, 1, 1))
+    with pytest.raises(NotFoundError, match="Operation 1"):
+        domain.apply_transaction(
+            [
+                TerminateOperation("AAPL", date(2024, 2, 1)),
+                TerminateOperation("MSFT", date(2024, 2, 1)),
+            ]
+        )
+    assert domain.get_identifier("AAPL", date(2024, 3, 1)) == 1
+
+
+# ── Bulk import ───────────────────────────────────────────────────────────────
+
+
+def test_import_loads_mappings_and_bumps_revision(domain: SymbologyServer):
+    before = domain.store_revision()
+    count = domain.import_mappings(
+        [
+            Mapping("AAPL", 1, date(2020, 1, 1), date(2021, 1, 1)),
+            Mapping("AAPL", 2, date(2021, 1, 1)),
+        ]
+    )
+    assert count == 2
+    assert domain.get_identifier("AAPL", date(2021, 6, 1)) == 2
+    assert domain.store_revision() != before
+
+
+def test_import_rejects_overlapping_identifiers(domain: SymbologyServer):
+    with pytest.raises(ConflictError, match="identifier '1'"):
+        domain.import_mappings(
+            [
+                Mapping("AAPL", 1, date(2020, 1, 1)),
+                Mapping("MSFT", 1, date(2021, 1, 1)),
+            ]
+        )
+
+
+def test_import_requires_empty_store(domain: SymbologyServer):
+    domain.add_mapping("AAPL", 1, date(2020, 1, 1))
+    with pytest.raises(ConflictError, match="empty store"):
+        domain.import_mappings([Mapping("MSFT", 2, date(2020, 1, 1))])
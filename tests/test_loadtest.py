@@ -0,0 +1,42 @@
+"""
+Tests for the load-testing harness.
+
+Runs a small in-process load test and checks the shape of the report, plus
+the percentile and Zipf helpers it relies on.
+"""
+
+import asyncio
+import json
+from src.loadtest import LoadTestConfig, percentile, run, zipf_cum_weights
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+
+
+def test_zipf_weights_favor_low_ranks():
+    cum = zipf_cum_weights(100, 1.1)
+    first = cum[0] / cum[-1]
+    last = (cum[-1] - cum[-2]) / cum[-1]
+    assert first > 50 * last
+
+
+def test_in_process_run_reports_every_route():
+    config = LoadTestConfig(symbols=20, requests=200, concurrency=4)
+    report = asyncio.run(run(config))
+
+    assert report["requests"] == 200
+    assert set(report["routes"]) == {
+        "GET /symbol/{symbol}",
+        "GET /identifier/{identifier}",
+        "GET /mappings",
+        "POST /transactions",
+    }
+    for route in report["routes"].values():
+        assert not any(code.startswith("5") for code in route["status"])
+        latency = route["latency_ms"]
+        assert latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    json.dumps(report)
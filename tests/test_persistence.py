@@ -8,6 +8,7 @@ written to disk and reloaded by a fresh MappingStorage instance.
 from datetime import date
 from src.storage import MappingStorage
 from src.domain import SymbologyServer
+from src.models import AddOperation, Mapping, TerminateOperation
 
 
 def test_mapping_survives_restart(tmp_path):
@@ -46,3 +47,45 @@ def test_termination_survives_restart(tmp_path):
 
     with pytest.raises(NotFoundError):
         domain2.lookup("AAPL", date(2024, 1, 10))
+
+
+def test_transaction_persists_once(tmp_path, monkeypatch):
+    """A committed batch is written with a single save and survives reload."""
+    persist_file = str(tmp_path / "mappings.json")
+
+    storage1 = MappingStorage(persist_file=persist_file)
+    domain1 = SymbologyServer(storage1)
+    domain1.add_mapping("FB", 7, date(2020, 1, 1))
+
+    saves = []
+    original_save = storage1.save
+    monkeypatch.setattr(storage1, "save", lambda: saves.append(original_save()))
+    domain1.apply_transaction(
+        [
+            TerminateOperation("FB", date(2022, 6, 9)),
+            AddOperation("META", 7, date(2022, 6, 9)),
+        ]
+    )
+    assert len(saves) == 1
+
+    storage2 = MappingStorage(persist_file=persist_file)
+    domain2 = SymbologyServer(storage2)
+    assert domain2.get_symbol(7, date(2022, 6, 8)) == "FB"
+    assert domain2.get_symbol(7, date(2022, 6, 9)) == "META"
+
+
+def test_import_persists_once(tmp_path, monkeypatch):
+    """A bulk import is written with a single save and survives reload."""
+    persist_file = str(tmp_path / "mappings.json")
+
+    storage1 = MappingStorage(persist_file=persist_file)
+    saves = []
+    original_save = storage1.save
+    monkeypatch.setattr(storage1, "save", lambda: saves.append(original_save()))
+    SymbologyServer(storage1).import_mappings(
+        [Mapping(f"S{i}", i, date(2024, 1, 1)) for i in range(100)]
+    )
+    assert len(saves) == 1
+
+    storage2 = MappingStorage(persist_file=persist_file)
+    assert SymbologyServer(storage2).get_symbol(42, date(2024, 1, 2)) == "S42"
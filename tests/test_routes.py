@@ -5,9 +5,17 @@ Tests exercise the FastAPI routes end-to-end via TestClient, verifying:
     - Request/response serialization
     - Correct HTTP status codes (200, 201, 404, 409)
     - Error detail propagation from the domain layer
+    - Atomic transaction batches
+    - Liveness and readiness probes
+    - Streaming export with Range/If-Range resume, and bulk import
 """
 
+import gzip
+import time
+from datetime import date
 from fastapi.testclient import TestClient
+from src.main import create_app
+from src.storage import MappingStorage
 
 # ── Add mapping ───────────────────────────────────────────────────────────────
 
@@ -38,6 +46,14 @@ def test_add_duplicate_mapping_returns_409(client: TestClient):
     assert "AAPL" in response.json()["detail"]
 
 
+def test_add_mapping_with_identifier_beyond_64_bits_returns_422(client: TestClient):
+    response = client.post(
+        "/mapping",
+        json={"symbol": "MSFT", "identifier": 2**63, "start_date": "2024-01-01"},
+    )
+    assert response.status_code == 422
+
+
 # ── Terminate mapping ─────────────────────────────────────────────────────────
 
 
@@ -123,3 +139,221 @@ def test_get_mappings_empty_range(client: TestClient):
     response = client.get("/mappings?begin=2023-01-01&end=2023-06-01")
     assert response.status_code == 200
     assert response.json() == []
+
+
+# ── Transactions ──────────────────────────────────────────────────────────────
+
+
+def test_transaction_applies_rename(client: TestClient):
+    client.post(
+        "/mapping",
+        json={"symbol": "FB", "identifier": 7, "start_date": "2020-01-01"},
+    )
+    response = client.post(
+        "/transactions",
+        json={
+            "operations": [
+                {"op": "terminate", "symbol": "FB", "end_date": "2022-06-09"},
+                {
+                    "op": "add",
+                    "symbol": "META",
+                    "identifier": 7,
+                    "start_date": "2022-06-09",
+                },
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert response.json() == {"status": "committed", "applied": 2}
+    assert client.get("/identifier/7?date=2022-06-09").json() == "META"
+
+
+def test_transaction_conflict_returns_409_and_rolls_back(client: TestClient):
+    client.post(
+        "/mapping",
+        json={"symbol": "AAPL", "identifier": 1, "start_date": "2024-01-01"},
+    )
+    response = client.post(
+        "/transactions",
+        json={
+            "operations": [
+                {"op": "terminate", "symbol": "AAPL", "end_date": "2024-02-01"},
+                {
+                    "op": "add",
+                    "symbol": "MSFT",
+                    "identifier": 1,
+                    "start_date": "2024-01-15",
+                },
+            ]
+        },
+    )
+    assert response.status_code == 409
+    assert "Operation 1" in response.json()["detail"]
+    assert client.get("/symbol/AAPL?date=2024-03-01").json() == 1
+
+
+def test_empty_transaction_returns_422(client: TestClient):
+    response = client.post("/transactions", json={"operations": []})
+    assert response.status_code == 422
+
+
+# ── Health and readiness ──────────────────────────────────────────────────────
+
+
+def test_health_and_ready_when_loaded(client: TestClient):
+    assert client.get("/health").json() == {"status": "ok"}
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+
+
+def test_requests_rejected_until_store_loaded():
+    client = TestClient(create_app(MappingStorage(autoload=False)))
+    assert client.get("/health").status_code == 200
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["state"] == "pending"
+
+    response = client.get("/symbol/AAPL?date=2024-01-01")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    response = client.post(
+        "/mapping",
+        json={"symbol": "AAPL", "identifier": 1, "start_date": "2024-01-01"},
+    )
+    assert response.status_code == 503
+
+
+def test_startup_loads_store_in_background(tmp_path):
+    persist_file = str(tmp_path / "mappings.json")
+    MappingStorage(persist_file=persist_file).insert("AAPL", 1, date(2024, 1, 1))
+
+    app = create_app(MappingStorage(persist_file=persist_file, autoload=False))
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 5
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert client.get("/symbol/AAPL?date=2024-01-02").json() == 1
+
+
+# ── Export and import ─────────────────────────────────────────────────────────
+
+
+def seed_rename(client: TestClient) -> None:
+    client.post(
+        "/mapping",
+        json={"symbol": "FB", "identifier": 7, "start_date": "2020-01-01"},
+    )
+    client.post("/mapping/terminate", json={"symbol": "FB", "end_date": "2022-06-09"})
+    client.post(
+        "/mapping",
+        json={"symbol": "META", "identifier": 7, "start_date": "2022-06-09"},
+    )
+
+
+def test_export_then_import_round_trip(client: TestClient):
+    seed_rename(client)
+    for format in ("ndjson", "segment"):
+        export = client.get(f"/export?format={format}")
+        assert export.status_code == 200
+        assert export.headers["Accept-Ranges"] == "bytes"
+
+        replica = TestClient(create_app(MappingStorage()))
+        response = replica.post(f"/import?format={format}", content=export.content)
+        assert response.status_code == 200
+        assert response.json()["count"] == 2
+        assert replica.get("/identifier/7?date=2021-01-01").json() == "FB"
+        assert replica.get("/identifier/7?date=2023-01-01").json() == "META"
+
+
+def test_export_resumes_with_range(client: TestClient):
+    seed_rename(client)
+    full = client.get("/export")
+    revision = full.headers["X-Store-Revision"]
+
+    client.post(
+        "/mapping",
+        json={"symbol": "NVDA", "identifier": 9, "start_date": "2024-01-01"},
+    )
+    resumed = client.get(f"/export?revision={revision}", headers={"Range": "bytes=10-"})
+    assert resumed.status_code == 206
+    assert (
+        resumed.headers["Content-Range"]
+        == f"bytes 10-{len(full.content) - 1}/{len(full.content)}"
+    )
+    assert resumed.content == full.content[10:]
+
+    by_offset = client.get(f"/export?revision={revision}&offset=10")
+    assert by_offset.content == full.content[10:]
+
+
+def test_export_resumes_with_if_range(client: TestClient):
+    seed_rename(client)
+    full = client.get("/export")
+    etag = full.headers["ETag"]
+
+    resumed = client.get("/export", headers={"Range": "bytes=10-", "If-Range": etag})
+    assert resumed.status_code == 206
+    assert resumed.content == full.content[10:]
+
+    client.post(
+        "/mapping",
+        json={"symbol": "NVDA", "identifier": 9, "start_date": "2024-01-01"},
+    )
+    # The store moved on: the whole new revision, not a splice of two.
+    restarted = client.get("/export", headers={"Range": "bytes=10-", "If-Range": etag})
+    assert restarted.status_code == 200
+    assert restarted.headers["ETag"] != etag
+    assert len(gzip.decompress(restarted.content).splitlines()) == 3
+
+
+def test_export_resume_without_revision_returns_428(client: TestClient):
+    seed_rename(client)
+    assert client.get("/export", headers={"Range": "bytes=10-"}).status_code == 428
+    assert client.get("/export?offset=10").status_code == 428
+
+
+def test_export_of_unavailable_revision_returns_412(client: TestClient):
+    seed_rename(client)
+    revision = client.get("/export").headers["X-Store-Revision"]
+    client.post(
+        "/mapping",
+        json={"symbol": "NVDA", "identifier": 9, "start_date": "2024-01-01"},
+    )
+    # Still retained as ndjson, but never exported as a segment.
+    assert client.get(f"/export?revision={revision}").status_code == 200
+    response = client.get(f"/export?format=segment&revision={revision}")
+    assert response.status_code == 412
+
+
+def test_export_range_outside_file_returns_416(client: TestClient):
+    revision = client.get("/export").headers["X-Store-Revision"]
+    response = client.get(
+        f"/export?revision={revision}", headers={"Range": "bytes=100000-"}
+    )
+    assert response.status_code == 416
+
+
+def test_import_into_non_empty_store_returns_409(client: TestClient):
+    seed_rename(client)
+    export = client.get("/export")
+    response = client.post("/import", content=export.content)
+    assert response.status_code == 409
+
+
+def test_import_with_string_identifier_returns_400():
+    line = b'{"symbol":"AAPL","identifier":"7","start_date":"2020-01-01"}\n'
+    replica = TestClient(create_app(MappingStorage()))
+    response = replica.post("/import", content=gzip.compress(line))
+    assert response.status_code == 400
+    assert replica.get("/symbol/AAPL?date=2021-01-01").status_code == 404
+
+
+def test_import_truncated_export_returns_400(client: TestClient):
+    seed_rename(client)
+    export = client.get("/export")
+    replica = TestClient(create_app(MappingStorage()))
+    response = replica.post("/import", content=export.content[:20])
+    assert response.status_code == 400
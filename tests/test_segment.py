@@ -0,0 +1,285 @@
+"""
+Tests for memory-mapped segments and tiered storage.
+
+Covers:
+    - Segment write/read round-trips, keyed lookups and range queries
+    - Merging a new segment from an old one
+    - Spilling old history out of memory and querying it back
+    - Re-terminating a spilled mapping
+    - Reloading a tiered store after restart
+    - Automatic background spilling
+"""
+
+import threading
+import time
+import pytest
+from datetime import date
+from src.domain import SymbologyServer
+from src.exceptions import ConflictError
+from src.models import AddOperation, Mapping, TerminateOperation
+from src.segment import ColdSegment, write_segment
+from src.storage import MappingStorage
+
+HORIZON = date(2020, 1, 1)
+
+
+def make_tiered(tmp_path) -> MappingStorage:
+    return MappingStorage(
+        persist_file=str(tmp_path / "hot.json"),
+        cold_file=str(tmp_path / "cold.seg"),
+        spill_interval=None,
+    )
+
+
+def seed_history(domain: SymbologyServer) -> None:
+    """AAPL held identifier 1 through 2010, then 2 from 2010 onwards."""
+    domain.add_mapping("AAPL", 1, date(2000, 1, 1))
+    domain.terminate_mapping("AAPL", date(2010, 1, 1))
+    domain.add_mapping("AAPL", 2, date(2010, 1, 1))
+    domain.add_mapping("MSFT", 3, date(2005, 1, 1))
+    domain.terminate_mapping("MSFT", date(2015, 1, 1))
+
+
+# ── Segments ──────────────────────────────────────────────────────────────────
+
+
+def test_segment_round_trip(tmp_path):
+    path = str(tmp_path / "s.seg")
+    mappings = [
+        Mapping("MSFT", 3, date(2005, 1, 1), date(2015, 1, 1)),
+        Mapping("AAPL", 2, date(2010, 1, 1)),
+        Mapping("AAPL", 1, date(2000, 1, 1), date(2010, 1, 1)),
+    ]
+    assert write_segment(path, HORIZON, mappings) == 3
+
+    segment = ColdSegment(path)
+    assert segment.horizon == HORIZON
+    assert [m.identifier for m in segment] == [1, 2, 3]
+    assert list(segment.by_symbol("AAPL")) == sorted(
+        mappings[1:], key=lambda m: m.start_date
+    )
+    assert list(segment.by_identifier(3)) == [mappings[0]]
+    assert list(segment.by_symbol("NVDA")) == []
+    assert list(segment.by_identifier(99)) == []
+
+
+def test_segment_range_query_uses_start_index(tmp_path):
+    path = str(tmp_path / "s.seg")
+    mappings = [
+        Mapping("A", 1, date(2000, 1, 1), date(2000, 2, 1)),
+        Mapping("B", 2, date(1990, 1, 1), date(2005, 1, 1)),
+        Mapping("C", 3, date(2003, 1, 1), date(2003, 6, 1)),
+        Mapping("D", 4, date(2010, 1, 1)),
+    ]
+    write_segment(path, HORIZON, mappings)
+    segment = ColdSegment(path)
+
+    def between(begin: date, end: date) -> list[int]:
+        return [m.identifier for m in segment.overlapping(begin, end)]
+
+    assert between(date(2003, 1, 1), date(2003, 2, 1)) == [2, 3]
+    assert between(date(2000, 2, 1), date(2002, 1, 1)) == [2]
+    assert between(date(2005, 1, 1), date(2010, 1, 1)) == []
+    assert between(date(2020, 1, 1), date(2021, 1, 1)) == [4]
+
+
+def test_segment_merge_drops_excluded(tmp_path):
+    first = str(tmp_path / "a.seg")
+    write_segment(first, HORIZON, [Mapping("A", 1, date(2000, 1, 1), date(2001, 1, 1))])
+    base = ColdSegment(first)
+
+    merged = str(tmp_path / "b.seg")
+    write_segment(
+        merged,
+        HORIZON,
+        [Mapping("B", 2, date(2000, 1, 1), date(2002, 1, 1))],
+        base=base,
+        exclude={("A", 1, date(2000, 1, 1), date(2001, 1, 1))},
+    )
+    assert [m.symbol for m in ColdSegment(merged)] == ["B"]
+
+
+# ── Tiered storage ────────────────────────────────────────────────────────────
+
+
+def test_spill_moves_old_history_out_of_memory(tmp_path):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    seed_history(domain)
+
+    assert storage.spill(horizon=date(2012, 1, 1)) == 1
+    assert [m.identifier for m in storage._mappings] == [2, 3]
+
+    assert domain.get_identifier("AAPL", date(2005, 1, 1)) == 1
+    assert domain.get_symbol(1, date(2009, 12, 31)) == "AAPL"
+    assert domain.get_identifier("AAPL", date(2012, 1, 1)) == 2
+    spanning = domain.get_mappings_between(date(2009, 1, 1), date(2011, 1, 1))
+    assert {m.identifier for m in spanning} == {1, 2, 3}
+
+
+def test_writers_are_not_blocked_while_spill_writes_segment(tmp_path, monkeypatch):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    seed_history(domain)
+    storage.spill(horizon=date(2012, 1, 1))
+
+    def write_concurrently(*args, **kwargs):
+        # MSFT is being spilled and AAPL 1 is in the old segment.
+        def terminate():
+            domain.terminate_mapping("MSFT", date(2014, 1, 1))
+            domain.terminate_mapping("AAPL", date(2005, 1, 1))
+
+        writer = threading.Thread(target=terminate)
+        writer.start()
+        writer.join(timeout=5)
+        assert not writer.is_alive()
+        return write_segment(*args, **kwargs)
+
+    monkeypatch.setattr("src.storage.write_segment", write_concurrently)
+    assert storage.spill(horizon=date(2016, 1, 1)) == 1
+    expected = [date(2005, 1, 1), date(2014, 1, 1)]
+    found = domain.get_mappings_between(date(1999, 1, 1), date(2020, 1, 1))
+    assert sorted(m.end_date for m in found if m.end_date) == expected
+
+    monkeypatch.undo()
+    storage.spill(horizon=date(2016, 1, 1))
+    assert sorted(m.end_date for m in ColdSegment(storage.cold_file)) == expected
+
+
+def test_cold_history_still_blocks_conflicts(tmp_path):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    seed_history(domain)
+    storage.spill(horizon=date(2012, 1, 1))
+
+    with pytest.raises(ConflictError):
+        domain.add_mapping("IBM", 1, date(2005, 1, 1))
+
+
+def test_terminating_spilled_mapping_promotes_it(tmp_path):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    seed_history(domain)
+    storage.spill(horizon=date(2012, 1, 1))
+
+    domain.terminate_mapping("AAPL", date(2005, 1, 1))
+    early = domain.get_mappings_between(date(2000, 1, 1), date(2001, 1, 1))
+    assert [m.end_date for m in early] == [date(2005, 1, 1)]
+
+    storage.spill(horizon=date(2012, 1, 1))
+    assert [m.end_date for m in ColdSegment(storage.cold_file)] == [date(2005, 1, 1)]
+
+
+def test_promotion_is_invisible_to_readers_of_old_tiers(tmp_path):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    seed_history(domain)
+    storage.spill(horizon=date(2012, 1, 1))
+
+    hot, cold = storage._tiers()
+    domain.terminate_mapping("AAPL", date(2005, 1, 1))
+    assert [m.identifier for m in hot] == [2, 3]
+    assert not cold.masked
+
+
+def test_zero_length_mapping_survives_promotion_of_its_successor(tmp_path):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    domain.add_mapping("AAPL", 1, date(2000, 1, 1))
+    domain.terminate_mapping("AAPL", date(2000, 1, 1))
+    domain.add_mapping("AAPL", 1, date(2000, 1, 1))
+    domain.terminate_mapping("AAPL", date(2005, 1, 1))
+    storage.spill(horizon=date(2012, 1, 1))
+
+    domain.terminate_mapping("AAPL", date(2003, 1, 1))
+    expected = [date(2000, 1, 1), date(2003, 1, 1)]
+
+    def end_dates(storage: MappingStorage) -> list[date]:
+        found = storage.get_mappings_between(date(1999, 1, 1), date(2010, 1, 1))
+        return sorted(m.end_date for m in found)
+
+    assert end_dates(storage) == expected
+    assert end_dates(make_tiered(tmp_path)) == expected
+    storage.spill(horizon=date(2012, 1, 1))
+    assert sorted(m.end_date for m in ColdSegment(storage.cold_file)) == expected
+
+
+def test_transaction_can_terminate_cold_mapping(tmp_path):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    seed_history(domain)
+    storage.spill(horizon=date(2012, 1, 1))
+
+    domain.apply_transaction(
+        [
+            TerminateOperation("AAPL", date(2005, 1, 1)),
+            AddOperation("AAPL", 9, date(2005, 1, 1)),
+        ]
+    )
+    assert domain.get_identifier("AAPL", date(2006, 1, 1)) == 9
+
+
+def test_tiered_store_survives_restart(tmp_path):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    seed_history(domain)
+    storage.spill(horizon=date(2012, 1, 1))
+
+    reloaded = make_tiered(tmp_path)
+    assert len(reloaded._mappings) == 2
+    assert SymbologyServer(reloaded).get_symbol(1, date(2005, 1, 1)) == "AAPL"
+
+
+def test_reload_masks_mappings_present_in_both_tiers(tmp_path):
+    """A crash between writing the segment and saving the hot file is safe."""
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    seed_history(domain)
+    storage.save = lambda: None
+    storage.spill(horizon=date(2012, 1, 1))
+
+    reloaded = make_tiered(tmp_path)
+    results = reloaded.get_mappings_between(date(2000, 1, 1), date(2001, 1, 1))
+    assert len(results) == 1
+
+
+def test_background_spill_runs_automatically(tmp_path):
+    storage = MappingStorage(
+        persist_file=str(tmp_path / "hot.json"),
+        cold_file=str(tmp_path / "cold.seg"),
+        spill_interval=0.01,
+    )
+    seed_history(SymbologyServer(storage))
+    try:
+        deadline = time.monotonic() + 5
+        while len(storage._mappings) > 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        storage.close()
+    assert SymbologyServer(storage).get_identifier("AAPL", date(2005, 1, 1)) == 1
+
+
+def test_export_rows_include_cold_history(tmp_path):
+    storage = make_tiered(tmp_path)
+    seed_history(SymbologyServer(storage))
+    storage.spill(horizon=date(2012, 1, 1))
+
+    _, rows = storage.export_rows()
+    assert sorted(m.identifier for m in rows) == [1, 2, 3]
+
+
+def test_export_order_does_not_change_when_rows_spill(tmp_path):
+    storage = make_tiered(tmp_path)
+    domain = SymbologyServer(storage)
+    domain.add_mapping("B", 2, date(2000, 1, 1))
+    domain.terminate_mapping("B", date(2001, 1, 1))
+    domain.add_mapping("A", 1, date(2000, 1, 1))
+
+    before, rows = storage.export_rows()
+    exported = list(rows)
+    storage.spill(horizon=date(2012, 1, 1))
+    after, rows = storage.export_rows()
+    assert after == before
+    assert list(rows) == exported
+    assert [m.symbol for m in exported] == ["A", "B"]
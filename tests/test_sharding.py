@@ -0,0 +1,253 @@
+"""
+Tests for the symbol-sharded deployment mode.
+
+Runs two real shard processes and verifies:
+    - Stable symbol → shard assignment
+    - Lookups and reverse lookups routed to the owning shard
+    - Cross-shard identifier conflicts caught by the global index
+    - Range queries fanned out and merged
+    - Cross-shard transactions, including rollback on every shard
+    - Identifier reservations released despite a concurrent transaction
+    - Shards committing without the index lock, and failed commits released
+    - Index pruned to recent history, with older dates asked of every shard
+    - Per-shard persistence across restarts
+    - Bulk import and chunked export across shards
+    - An import refused by one shard leaving every shard untouched
+"""
+
+import threading
+import time
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+from src.exceptions import ConflictError, NotFoundError
+from src.main import create_sharded_app
+from src.models import AddOperation, Mapping, TerminateOperation
+from src import sharding
+from src.sharding import ShardedSymbologyServer, shard_for
+
+# Two symbols known to hash to different shards when shards=2.
+A, B = "AAPL", "MSFT"
+
+
+def start_sharded(**kwargs) -> ShardedSymbologyServer:
+    server = ShardedSymbologyServer(2, **kwargs)
+    server.start()
+    assert server.wait_ready(timeout=30)
+    return server
+
+
+@pytest.fixture
+def sharded():
+    server = start_sharded()
+    yield server
+    server.close()
+
+
+def test_shard_assignment_is_stable():
+    assert shard_for(A, 2) != shard_for(B, 2)
+    assert shard_for(A, 2) == shard_for(A, 2)
+
+
+def test_lookups_route_to_owning_shard(sharded: ShardedSymbologyServer):
+    sharded.add_mapping(A, 1, date(2024, 1, 1))
+    sharded.add_mapping(B, 2, date(2024, 1, 1))
+    assert sharded.get_identifier(A, date(2024, 2, 1)) == 1
+    assert sharded.get_symbol(2, date(2024, 2, 1)) == B
+    with pytest.raises(NotFoundError):
+        sharded.get_symbol(1, date(2023, 1, 1))
+
+
+def test_identifier_conflict_across_shards(sharded: ShardedSymbologyServer):
+    sharded.add_mapping(A, 1, date(2024, 1, 1))
+    with pytest.raises(ConflictError):
+        sharded.add_mapping(B, 1, date(2024, 2, 1))
+
+    sharded.terminate_mapping(A, date(2024, 3, 1))
+    sharded.add_mapping(B, 1, date(2024, 3, 1))
+    assert sharded.get_symbol(1, date(2024, 3, 1)) == B
+
+
+def test_range_query_merges_shards(sharded: ShardedSymbologyServer):
+    sharded.add_mapping(A, 1, date(2024, 1, 1))
+    sharded.add_mapping(B, 2, date(2024, 1, 5))
+    results = sharded.get_mappings_between(date(2024, 1, 1), date(2024, 2, 1))
+    assert [m.symbol for m in results] == [A, B]
+
+
+def test_cross_shard_transaction(sharded: ShardedSymbologyServer):
+    sharded.add_mapping(A, 7, date(2020, 1, 1))
+    sharded.apply_transaction(
+        [
+            TerminateOperation(A, date(2022, 6, 9)),
+            AddOperation(B, 7, date(2022, 6, 9)),
+        ]
+    )
+    assert sharded.get_symbol(7, date(2022, 6, 8)) == A
+    assert sharded.get_symbol(7, date(2022, 6, 9)) == B
+
+
+def test_cross_shard_transaction_rolls_back(sharded: ShardedSymbologyServer):
+    sharded.add_mapping(A, 7, date(2020, 1, 1))
+    with pytest.raises(ConflictError, match="Operation 1"):
+        sharded.apply_transaction(
+            [
+                TerminateOperation(A, date(2022, 6, 9)),
+                AddOperation(B, 7, date(2022, 6, 1)),
+            ]
+        )
+    assert sharded.get_identifier(A, date(2023, 1, 1)) == 7
+    with pytest.raises(NotFoundError):
+        sharded.lookup(B, date(2023, 1, 1))
+
+
+def test_failed_add_releases_reservation_after_transaction(
+    sharded: ShardedSymbologyServer,
+):
+    sharded.add_mapping(B, 1, date(2020, 1, 1))
+    errors = []
+
+    def add_rejected_by_shard():
+        try:
+            sharded.add_mapping(B, 99, date(2021, 1, 1))
+        except ConflictError as exc:
+            errors.append(exc)
+
+    # Hold B's shard so the add waits there with identifier 99 reserved.
+    with sharded._locks[shard_for(B, 2)]:
+        thread = threading.Thread(target=add_rejected_by_shard)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while 99 not in sharded._index:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        sharded.apply_transaction(
+            [
+                AddOperation(A, 99, date(2020, 6, 1)),
+                TerminateOperation(A, date(2020, 7, 1)),
+            ]
+        )
+    thread.join()
+
+    assert len(errors) == 1
+    sharded.add_mapping("NVDA", 99, date(2021, 1, 1))
+    assert sharded.get_symbol(99, date(2021, 1, 2)) == "NVDA"
+
+
+def test_transaction_commits_without_index_lock(sharded: ShardedSymbologyServer):
+    index_locked = []
+
+    class CommitProbe:
+        """Records the index lock during commits; fails the commit on B's shard."""
+
+        def __init__(self, conn, fail: bool):
+            self.conn, self.fail, self.last = conn, fail, None
+
+        def send(self, message):
+            self.last = message[0]
+            self.conn.send(message)
+
+        def recv(self):
+            reply = self.conn.recv()
+            if self.last != "commit":
+                return reply
+            index_locked.append(sharded._index_lock.locked())
+            return ("error", OSError("disk full")) if self.fail else reply
+
+    for shard, conn in enumerate(sharded._conns):
+        sharded._conns[shard] = CommitProbe(conn, fail=shard == shard_for(B, 2))
+    with pytest.raises(OSError, match="disk full"):
+        sharded.apply_transaction(
+            [AddOperation(A, 5, date(2024, 1, 1)), AddOperation(B, 6, date(2024, 1, 1))]
+        )
+
+    assert index_locked == [False, False]
+    assert 5 in sharded._index
+    assert 6 not in sharded._index
+
+
+def test_pruned_index_falls_back_to_shards(tmp_path):
+    server = start_sharded(cold_file=str(tmp_path / "cold.seg"), prune_interval=None)
+    try:
+        server.add_mapping(A, 1, date(2000, 1, 1))
+        server.terminate_mapping(A, date(2010, 1, 1))
+        server.add_mapping(B, 2, date(2010, 1, 1))
+
+        assert server.prune_index(horizon=date(2012, 1, 1)) == 1
+        assert 1 not in server._index
+
+        assert server.get_symbol(1, date(2005, 1, 1)) == A
+        with pytest.raises(ConflictError):
+            server.add_mapping("NVDA", 1, date(2005, 1, 1))
+        with pytest.raises(ConflictError, match="Operation 0"):
+            server.apply_transaction([AddOperation("NVDA", 1, date(2009, 1, 1))])
+        server.add_mapping("NVDA", 1, date(2010, 1, 1))
+        assert server.get_symbol(1, date(2011, 1, 1)) == "NVDA"
+    finally:
+        server.close()
+
+
+def test_shards_persist_across_restart(tmp_path):
+    persist_file = str(tmp_path / "mappings.json")
+    server = start_sharded(persist_file=persist_file)
+    server.add_mapping(A, 1, date(2024, 1, 1))
+    server.add_mapping(B, 2, date(2024, 1, 1))
+    server.close()
+
+    server = start_sharded(persist_file=persist_file)
+    try:
+        assert server.get_symbol(2, date(2024, 1, 2)) == B
+        with pytest.raises(ConflictError):
+            server.add_mapping("NVDA", 1, date(2024, 6, 1))
+    finally:
+        server.close()
+
+
+def test_sharded_app_serves_requests():
+    with TestClient(create_sharded_app(ShardedSymbologyServer(2))) as client:
+        deadline = time.monotonic() + 30
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        response = client.post(
+            "/mapping",
+            json={"symbol": A, "identifier": 1, "start_date": "2024-01-01"},
+        )
+        assert response.status_code == 201
+        assert client.get("/identifier/1?date=2024-01-02").json() == A
+
+
+def test_sharded_import_and_export(sharded: ShardedSymbologyServer, monkeypatch):
+    monkeypatch.setattr(sharding, "EXPORT_CHUNK_ROWS", 1)
+    mappings = [
+        Mapping(A, 7, date(2020, 1, 1), date(2022, 6, 9)),
+        Mapping(B, 7, date(2022, 6, 9)),
+    ]
+    assert sharded.import_mappings(mappings) == 2
+    assert sharded.get_symbol(7, date(2023, 1, 1)) == B
+    with pytest.raises(ConflictError):
+        sharded.add_mapping("NVDA", 7, date(2023, 1, 1))
+
+    revision, rows = sharded.export_rows()
+    assert revision == sharded.store_revision()
+    assert sorted(rows, key=lambda m: m.start_date) == mappings
+    with pytest.raises(ConflictError, match="empty store"):
+        sharded.import_mappings(mappings)
+
+
+def test_sharded_import_aborts_on_every_shard(tmp_path):
+    server = start_sharded(cold_file=str(tmp_path / "cold.seg"), prune_interval=None)
+    try:
+        # B's shard holds old history the pruned index no longer mentions.
+        server.add_mapping(B, 1, date(2000, 1, 1))
+        server.terminate_mapping(B, date(2001, 1, 1))
+        server.prune_index(horizon=date(2012, 1, 1))
+
+        with pytest.raises(ConflictError, match="empty store"):
+            server.import_mappings(
+                [Mapping(A, 7, date(2020, 1, 1)), Mapping(B, 8, date(2020, 1, 1))]
+            )
+        with pytest.raises(NotFoundError):
+            server.lookup(A, date(2021, 1, 1))
+    finally:
+        server.close()
@@ -0,0 +1,185 @@
+"""
+Tests for full-store export formats and the export file cache.
+
+Covers:
+    - gzip NDJSON and binary segment round-trips
+    - Rejection of truncated or ill-typed uploads
+    - Pinning an export to a store revision, and retention of old ones
+    - Creating the export directory lazily and removing it on close
+    - Building exports without blocking reads of built ones
+"""
+
+import gzip
+import os
+import threading
+import pytest
+from datetime import date
+from src.domain import SymbologyServer
+from src.exceptions import SnapshotExpiredError
+from src.models import Mapping
+from src.segment import write_segment
+from src.snapshots import SnapshotExporter, read_rows, write_ndjson
+
+MAPPINGS = [
+    Mapping("AAPL", 1, date(2000, 1, 1), date(2010, 1, 1)),
+    Mapping("AAPL", 2, date(2010, 1, 1)),
+    Mapping("MSFT", 3, date(2005, 1, 1)),
+]
+
+
+@pytest.fixture
+def exporter(domain: SymbologyServer, tmp_path) -> SnapshotExporter:
+    return SnapshotExporter(domain.store_revision, domain.export_rows, str(tmp_path))
+
+
+# ── Formats ───────────────────────────────────────────────────────────────────
+
+
+def test_ndjson_round_trip(tmp_path):
+    path = str(tmp_path / "export.ndjson.gz")
+    write_ndjson(path, MAPPINGS)
+    with gzip.open(path, "rt") as f:
+        assert len(f.readlines()) == 3
+    assert read_rows(path, "ndjson") == MAPPINGS
+
+
+def test_segment_export_round_trip(domain: SymbologyServer, exporter):
+    domain.import_mappings(MAPPINGS)
+    snapshot, f = exporter.open("segment")
+    f.close()
+    rows = read_rows(snapshot.path, "segment")
+    assert sorted(rows, key=lambda m: m.identifier) == MAPPINGS
+
+
+def test_truncated_upload_rejected(tmp_path):
+    path = str(tmp_path / "export.ndjson.gz")
+    write_ndjson(path, MAPPINGS)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[: len(data) // 2])
+    with pytest.raises(ValueError):
+        read_rows(path, "ndjson")
+
+
+@pytest.mark.parametrize("cut", [5, 20, 100])
+def test_truncated_segment_upload_rejected(tmp_path, cut: int):
+    path = str(tmp_path / "export.seg")
+    write_segment(
+        path,
+        date.min,
+        MAPPINGS + [Mapping("MSFTLONGSYMBOL", 4, date(2001, 1, 1), date(2002, 1, 1))],
+    )
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-cut])
+    with pytest.raises(ValueError, match="Invalid segment snapshot"):
+        read_rows(path, "segment")
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        b'{"symbol":"AAPL","identifier":"7","start_date":"2020-01-01"}',
+        (
+            b'{"symbol":"AAPL","identifier":7,"start_date":"2020-01-01",'
+            b'"end_date":"2019-01-01"}'
+        ),
+        (
+            b'{"symbol":"AAPL","identifier":9223372036854775808,'
+            b'"start_date":"2020-01-01"}'
+        ),
+    ],
+)
+def test_ill_typed_rows_rejected(tmp_path, line: bytes):
+    path = str(tmp_path / "export.ndjson.gz")
+    with gzip.open(path, "wb") as f:
+        f.write(line + b"\n")
+    with pytest.raises(ValueError, match="Invalid ndjson snapshot"):
+        read_rows(path, "ndjson")
+
+
+# ── Revision pinning ──────────────────────────────────────────────────────────
+
+
+def snapshot(exporter: SnapshotExporter, revision: str | None = None):
+    found, f = exporter.open("ndjson", revision)
+    f.close()
+    return found
+
+
+def test_export_reused_until_store_changes(domain: SymbologyServer, exporter):
+    domain.add_mapping("AAPL", 1, date(2024, 1, 1))
+    first = snapshot(exporter)
+    assert snapshot(exporter) == first
+
+    domain.add_mapping("MSFT", 2, date(2024, 1, 1))
+    second = snapshot(exporter)
+    assert second.revision != first.revision
+    # Older revisions stay available for resumes within the retention period.
+    assert snapshot(exporter, first.revision) == first
+
+
+def test_expired_revision_raises(domain: SymbologyServer, tmp_path):
+    exporter = SnapshotExporter(
+        domain.store_revision, domain.export_rows, str(tmp_path), retention=0
+    )
+    domain.add_mapping("AAPL", 1, date(2024, 1, 1))
+    first = snapshot(exporter)
+    domain.add_mapping("MSFT", 2, date(2024, 1, 1))
+    snapshot(exporter)
+
+    assert not os.path.exists(first.path)
+    with pytest.raises(SnapshotExpiredError):
+        snapshot(exporter, first.revision)
+
+
+def test_export_directory_created_lazily_and_removed(domain: SymbologyServer):
+    exporter = SnapshotExporter(domain.store_revision, domain.export_rows)
+    assert exporter.directory is None
+
+    directory = os.path.dirname(snapshot(exporter).path)
+    assert os.path.isdir(directory)
+    exporter.close()
+    assert not os.path.exists(directory)
+
+
+def test_stale_revision_rejected_without_reading_rows(domain: SymbologyServer):
+    domain.add_mapping("AAPL", 1, date(2024, 1, 1))
+
+    def export_rows():
+        raise AssertionError("rows materialized for a stale revision")
+
+    exporter = SnapshotExporter(domain.store_revision, export_rows)
+    with pytest.raises(SnapshotExpiredError):
+        exporter.open("ndjson", "stale-1")
+
+
+def test_built_export_opens_while_another_builds(domain: SymbologyServer, exporter):
+    domain.add_mapping("AAPL", 1, date(2024, 1, 1))
+    built = snapshot(exporter)
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_export_rows():
+        started.set()
+        release.wait(timeout=5)
+        return domain.export_rows()
+
+    exporter._export_rows = slow_export_rows
+    builder = threading.Thread(target=exporter.open, args=("segment",))
+    builder.start()
+    try:
+        assert started.wait(timeout=5)
+        # Resuming the built ndjson file does not wait for the segment.
+        resumed = []
+        reader = threading.Thread(
+            target=lambda: resumed.append(snapshot(exporter, built.revision))
+        )
+        reader.start()
+        reader.join(timeout=2)
+        assert resumed == [built]
+    finally:
+        release.set()
+        builder.join()
@@ -7,6 +7,8 @@ including:
     - Half-open interval boundary behavior
     - Date-range overlap queries
     - Persistence round-trip (save and load)
+    - Deferred and background loading
+    - Transactions staged as an overlay
 """
 
 from datetime import date
@@ -92,3 +94,49 @@ def test_persistence_preserves_end_date(tmp_path):
     s2 = MappingStorage(persist_file=persist_file)
     assert s2._mappings[0].end_date == date(2024, 6, 1)
     assert isinstance(s2._mappings[0].end_date, date)
+
+
+# ── Background loading ────────────────────────────────────────────────────────
+
+
+def test_deferred_storage_is_not_ready(tmp_path):
+    storage = MappingStorage(persist_file=str(tmp_path / "m.json"), autoload=False)
+    assert not storage.ready
+    assert storage.load_status().state == "pending"
+
+
+def test_background_load_reports_progress(tmp_path):
+    persist_file = str(tmp_path / "mappings.json")
+    s1 = MappingStorage(persist_file=persist_file)
+    s1.insert("AAPL", 1, date(2024, 1, 1))
+    s1.insert("MSFT", 2, date(2024, 1, 1))
+
+    s2 = MappingStorage(persist_file=persist_file, autoload=False)
+    s2.start_background_load().join()
+
+    assert s2.ready
+    status = s2.load_status()
+    assert (status.state, status.loaded, status.total) == ("ready", 2, 2)
+    assert s2.find_active_by_symbol("MSFT", date(2024, 1, 2)) is not None
+
+
+# ── Transactions ──────────────────────────────────────────────────────────────
+
+
+def test_transaction_stages_only_touched_rows(storage: MappingStorage):
+    storage.insert("AAPL", 1, date(2020, 1, 1))
+    storage.insert("MSFT", 2, date(2020, 1, 1))
+    before = list(storage._mappings)
+
+    with storage.transaction() as staged:
+        aapl = staged.find_active_by_symbol("AAPL", date(2022, 6, 9))
+        staged.terminate(aapl, date(2022, 6, 9))
+        staged.insert("AAPL", 3, date(2022, 6, 9))
+        assert staged.find_active_by_symbol("AAPL", date(2022, 6, 9)).identifier == 3
+        # The live store is untouched until the block exits.
+        assert storage.find_active_by_symbol("AAPL", date(2023, 1, 1)).identifier == 1
+
+    assert before[0].end_date is None
+    assert storage._mappings[1] is before[1]
+    assert storage.find_active_by_symbol("AAPL", date(2022, 6, 8)).identifier == 1
+    assert storage.find_active_by_symbol("AAPL", date(2022, 6, 9)).identifier == 3